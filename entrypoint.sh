@@ -1,4 +1,6 @@
 #!/bin/sh
 set -e
+cd /app
+python -m src.prediction_scripts.catalog
 cd /app/src/recommenderapp
 exec python app.py
@@ -0,0 +1,818 @@
+"""
+Copyright (c) 2023 Aditya Pai, Ananya Mantravadi, Rishi Singhal, Samarth Shetty
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Process-wide movie catalog shared by the recommender, search and emails.
+
+The catalog is parsed from data/movies.csv once and turned into NumPy
+structures (genre matrix, title index, people indexes) so that serving a
+request only needs array arithmetic. build_artifact() stores those
+structures as a directory of .npy files that later processes memory-map
+instead of parsing the CSV:
+
+    python -m src.prediction_scripts.catalog
+
+Ratings refreshed later are appended to delta files under
+data/catalog/deltas and merged into a new artifact by merge_deltas(),
+without rewriting movies.csv.
+
+A running process swaps in a new catalog version, built together with the
+indexes derived from it (register_index), when CatalogWatcher notices that
+movies.csv or the current artifact changed, or on reload_in_background().
+Readers keep the catalog object they got, so requests in flight finish on
+the version they started with.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+code_dir = os.path.dirname(app_dir)
+project_dir = os.path.dirname(code_dir)
+
+MOVIES_CSV = os.path.join(project_dir, "data", "movies.csv")
+CATALOG_DIR = os.path.join(project_dir, "data", "catalog")
+
+# Bumped whenever the artifact layout changes
+ARTIFACT_FORMAT = 3
+# Artifact builds kept next to the current one for readers still using them
+KEEP_ARTIFACTS = 2
+
+# Text columns kept by the catalog
+STRING_COLUMNS = ("title", "genres", "imdb_id", "director", "actors")
+
+# Rating placeholders written by the scraper, stored as NaN
+MISSING_RATINGS = ("Error", "No Rating Found")
+# Score given to movies without an IMDb rating
+MISSING_RATING_SCORE = 1.0
+# Sub-directory of the catalog directory holding rating delta files
+DELTAS = "deltas"
+# Seconds between two checks of CatalogWatcher
+WATCH_INTERVAL = 30.0
+
+
+def split_people(value):
+    """
+    Splits a comma separated director/actor field into a set of names.
+    """
+    if not isinstance(value, str) or not value:
+        return frozenset()
+    return frozenset(value.split(","))
+
+
+def parse_ratings(ratings):
+    """
+    Converts the raw imdb_ratings column to float32, NaN where missing.
+    """
+    numbers = pd.to_numeric(ratings.replace(list(MISSING_RATINGS), np.nan))
+    return numbers.to_numpy(dtype=np.float32)
+
+
+def parse_rating(value):
+    """
+    Converts one raw rating to a float, like parse_ratings.
+    """
+    return np.nan if value is None or value in MISSING_RATINGS else float(value)
+
+
+def normalize_ratings(imdb_ratings):
+    """
+    Scales the ratings to at most 1.0, missing ratings score like a
+    MISSING_RATING_SCORE rating.
+    """
+    scores = np.where(np.isnan(imdb_ratings), MISSING_RATING_SCORE, imdb_ratings)
+    if len(scores):
+        scores /= scores.max()
+    return scores.astype(np.float32)
+
+
+def rating_fetch_times(ratings, fetched_at):
+    """
+    Returns when each raw rating was fetched: fetched_at for ratings present
+    in the CSV, NaN for missing ones and failed lookups, which are due.
+    """
+    missing = ratings.isna() | (ratings.astype(str) == "Error")
+    return np.where(missing.to_numpy(), np.nan, float(fetched_at))
+
+
+def build_genre_matrix(genres):
+    """
+    One-hot encodes pipe separated genre strings.
+    Genre columns keep the order in which they first appear in the catalog.
+    """
+    genre_names = []
+    genre_columns = {}
+    rows = []
+    cols = []
+    for row, value in enumerate(genres):
+        if not value:
+            continue
+        for genre in value.split("|"):
+            if genre not in genre_columns:
+                genre_columns[genre] = len(genre_names)
+                genre_names.append(genre)
+            rows.append(row)
+            cols.append(genre_columns[genre])
+    matrix = np.zeros((len(genres), len(genre_names)))
+    matrix[rows, cols] = 1.0
+    return genre_names, matrix
+
+
+def encode_strings(values):
+    """
+    Encodes strings as one UTF-8 buffer plus the byte offset of each value.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(buffer, offsets):
+    """
+    Inverse of encode_strings, returns an object array of str.
+    """
+    data = buffer.tobytes()
+    bounds = offsets.tolist()
+    values = np.empty(len(bounds) - 1, dtype=object)
+    values[:] = [data[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+    return values
+
+
+class StringColumn:
+    """
+    Text column read from an artifact. The UTF-8 buffer and offsets stay
+    memory-mapped, so forked workers share their pages, and a value is only
+    decoded when it is accessed.
+    """
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def value(self, row):
+        """
+        Returns the str stored at row.
+        """
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.buffer[start:end].tobytes().decode("utf-8")
+
+    def __getitem__(self, rows):
+        """
+        Returns the str at an int row, or an object array of the rows picked
+        by an index or boolean array.
+        """
+        if np.ndim(rows) == 0:
+            row = int(rows)
+            return self.value(row + len(self) if row < 0 else row)
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        values = np.empty(len(rows), dtype=object)
+        values[:] = [self.value(row) for row in rows.tolist()]
+        return values
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.value(row)
+
+    def tolist(self):
+        """
+        Returns every value as a list of str.
+        """
+        return list(self)
+
+
+class PersonIndex:
+    """
+    Sparse movie x person incidence matrix for a comma separated column.
+    It is kept row-compressed (movie -> people) to look up a user's people
+    and column-compressed (person -> movies, the inverted index) to score them.
+    """
+
+    ARRAYS = ("movie_ptr", "people", "movies", "person_ptr")
+
+    def __init__(self, names, movie_ptr, people, movies, person_ptr):
+        self.names = names
+        self.ids = {name: person for person, name in enumerate(names)}
+        self.size = len(movie_ptr) - 1
+        self.movie_ptr = movie_ptr
+        self.people = people
+        self.movies = movies
+        self.person_ptr = person_ptr
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Builds the index from the raw comma separated column.
+        """
+        ids = {}
+        movie_ptr = [0]
+        people = []
+        for value in values:
+            for name in split_people(value):
+                people.append(ids.setdefault(name, len(ids)))
+            movie_ptr.append(len(people))
+
+        people = np.array(people, dtype=np.int32)
+        movie_rows = np.repeat(
+            np.arange(len(movie_ptr) - 1, dtype=np.int32), np.diff(movie_ptr)
+        )
+        person_ptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(people, minlength=len(ids)), out=person_ptr[1:])
+        return cls(
+            list(ids),
+            np.array(movie_ptr, dtype=np.int64),
+            people,
+            movie_rows[np.argsort(people, kind="stable")],
+            person_ptr,
+        )
+
+    def people_of(self, rows):
+        """
+        Returns the ids of every person credited on the given movie rows.
+        """
+        credits = [
+            self.people[self.movie_ptr[row] : self.movie_ptr[row + 1]] for row in rows
+        ]
+        if not credits:
+            return np.array([], dtype=np.int32)
+        return np.unique(np.concatenate(credits))
+
+    def movies_of(self, person):
+        """
+        Returns the rows of the movies a person is credited on.
+        """
+        return self.movies[self.person_ptr[person] : self.person_ptr[person + 1]]
+
+    def match_scores(self, people):
+        """
+        Counts, for every movie, how many of the given people it credits.
+        Only the postings of those people are visited.
+        """
+        postings = [self.movies_of(person) for person in people]
+        if not postings:
+            return np.zeros(self.size, dtype=np.int64)
+        return np.bincount(np.concatenate(postings), minlength=self.size)
+
+
+class MovieCatalog:
+    """
+    Read-only, preprocessed view of the movies table
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        movie_ids,
+        columns,
+        genre_names,
+        genre_matrix,
+        people,
+        imdb_ratings,
+        rating_fetched_at,
+    ):
+        """
+        :param columns: object arrays or StringColumns of the STRING_COLUMNS
+        :param people: PersonIndex of the "director" and "actors" columns
+        :param imdb_ratings: float32 ratings, NaN where missing
+        :param rating_fetched_at: epoch seconds each rating was fetched, NaN if never
+        """
+        self.version = 0
+        # artifact directory the catalog was loaded from, None for a CSV
+        self.path = None
+        self.deltas = []
+        # source_stamp() of the files it was read from, set by build_catalog
+        self.stamp = None
+        self.build_seconds = None
+        self.loaded_at = None
+        self.indexes = {}
+        self._indexes_lock = threading.Lock()
+        self.size = len(movie_ids)
+        self.movie_ids = movie_ids
+        self.columns = columns
+        self.titles = columns["title"]
+        self.genres = columns["genres"]
+        self.imdb_ids = columns["imdb_id"]
+        self.genre_names = genre_names
+        self.genre_matrix = genre_matrix
+        self.directors = people["director"]
+        self.actors = people["actors"]
+        self.imdb_ratings = imdb_ratings
+        # what the recommender scores, computed once per catalog
+        self.normalized_ratings = normalize_ratings(imdb_ratings)
+        self.rating_fetched_at = rating_fetched_at
+
+        self.title_rows = {}
+        for row, title in enumerate(self.titles):
+            self.title_rows.setdefault(title, []).append(row)
+
+    @classmethod
+    def from_frame(cls, movies, fetched_at=0.0):
+        """
+        Builds the catalog from a DataFrame shaped like movies.csv.
+        :param fetched_at: epoch seconds the ratings in the frame were fetched
+        """
+        columns = {
+            name: movies[name].fillna("").astype(str).to_numpy(dtype=object)
+            for name in STRING_COLUMNS
+        }
+        genre_names, genre_matrix = build_genre_matrix(columns["genres"])
+        people = {
+            name: PersonIndex.from_values(columns[name])
+            for name in ("director", "actors")
+        }
+        return cls(
+            movies["movieId"].to_numpy(),
+            columns,
+            genre_names,
+            genre_matrix,
+            people,
+            parse_ratings(movies["imdb_ratings"]),
+            rating_fetch_times(movies["imdb_ratings"], fetched_at),
+        )
+
+    @classmethod
+    def from_csv(cls, path=MOVIES_CSV):
+        """
+        Builds the catalog from a movies.csv file, whose ratings count as
+        fetched when the file was last modified.
+        """
+        return cls.from_frame(pd.read_csv(path), os.stat(path).st_mtime)
+
+    @classmethod
+    def from_artifact(cls, path):
+        """
+        Loads a catalog written by save(). Numeric arrays and the text
+        columns are memory-mapped read-only so forked workers share their
+        pages. Person names are decoded, their lookup dict needs them anyway.
+        """
+
+        def array(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+        def strings(name):
+            return StringColumn(array(name + ".utf8"), array(name + ".offsets"))
+
+        with open(os.path.join(path, "manifest.json"), encoding="utf8") as fh:
+            manifest = json.load(fh)
+        if manifest["format"] != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported catalog artifact format in {path}")
+
+        people = {
+            name: PersonIndex(
+                decode_strings(
+                    array(name + ".names.utf8"), array(name + ".names.offsets")
+                ).tolist(),
+                *(array(f"{name}.{field}") for field in PersonIndex.ARRAYS),
+            )
+            for name in ("director", "actors")
+        }
+        catalog = cls(
+            array("movie_ids"),
+            {name: strings(name) for name in STRING_COLUMNS},
+            manifest["genre_names"],
+            array("genre_matrix"),
+            people,
+            array("imdb_ratings"),
+            array("rating_fetched_at"),
+        )
+        catalog.path = path
+        catalog.deltas = manifest["deltas"]
+        return catalog
+
+    def save(self, path, source=None):
+        """
+        Writes the catalog as a directory of .npy arrays plus a manifest.
+        :param source: description of the data the catalog was built from
+        """
+        arrays = {
+            "movie_ids": self.movie_ids,
+            "genre_matrix": self.genre_matrix,
+            "imdb_ratings": self.imdb_ratings,
+            "rating_fetched_at": self.rating_fetched_at,
+        }
+        for name in STRING_COLUMNS:
+            column = self.columns[name]
+            if isinstance(column, StringColumn):
+                buffer, offsets = column.buffer, column.offsets
+            else:
+                buffer, offsets = encode_strings(column)
+            arrays[name + ".utf8"], arrays[name + ".offsets"] = buffer, offsets
+        for name, index in (("director", self.directors), ("actors", self.actors)):
+            buffer, offsets = encode_strings(index.names)
+            arrays[name + ".names.utf8"], arrays[name + ".names.offsets"] = (
+                buffer,
+                offsets,
+            )
+            for field in PersonIndex.ARRAYS:
+                arrays[f"{name}.{field}"] = getattr(index, field)
+
+        os.makedirs(path)
+        for name, values in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), np.asarray(values))
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "size": self.size,
+            "genre_names": self.genre_names,
+            "source": source,
+            "deltas": self.deltas,
+        }
+        with open(os.path.join(path, "manifest.json"), "w", encoding="utf8") as fh:
+            json.dump(manifest, fh)
+
+    def with_deltas(self, deltas):
+        """
+        Returns a copy of the catalog with the ratings of the given delta
+        files applied; a record only wins over an older fetch.
+        :param deltas: (file name, records) pairs in the order to apply them
+        """
+        ratings = np.array(self.imdb_ratings)
+        fetched_at = np.array(self.rating_fetched_at)
+        rows = {}
+        for row, imdb_id in enumerate(self.imdb_ids):
+            rows.setdefault(imdb_id, []).append(row)
+        for _, records in deltas:
+            for record in records:
+                for row in rows.get(record["imdb_id"], ()):
+                    if not fetched_at[row] >= record["fetched_at"]:
+                        ratings[row] = parse_rating(record["rating"])
+                        fetched_at[row] = record["fetched_at"]
+        catalog = MovieCatalog(
+            self.movie_ids,
+            self.columns,
+            self.genre_names,
+            self.genre_matrix,
+            {"director": self.directors, "actors": self.actors},
+            ratings,
+            fetched_at,
+        )
+        catalog.deltas = self.deltas + [name for name, _ in deltas]
+        return catalog
+
+    def index(self, name):
+        """
+        Returns the index registered under name for this catalog, building
+        it on first use.
+        """
+        index = self.indexes.get(name)
+        if index is None:
+            with self._indexes_lock:
+                index = self.indexes.get(name)
+                if index is None:
+                    index = self.indexes[name] = _index_builders[name](self)
+        return index
+
+    def build_indexes(self):
+        """
+        Builds every registered index that is not built yet.
+        """
+        for name in list(_index_builders):
+            self.index(name)
+
+    def genres_of(self, title):
+        """
+        Returns the genre list of a movie, or None for unknown titles.
+        """
+        rows = self.title_rows.get(title)
+        if not rows:
+            return None
+        return self.genres[rows[-1]].split("|")
+
+
+def csv_signature(csv_path):
+    """
+    Identifies the version of a movies.csv file by size and mtime.
+    """
+    stat = os.stat(csv_path)
+    return {
+        "path": os.path.abspath(csv_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def current_artifact(catalog_dir=CATALOG_DIR):
+    """
+    Returns the directory of the current artifact build, or None.
+    """
+    try:
+        with open(os.path.join(catalog_dir, "CURRENT"), encoding="utf8") as fh:
+            return os.path.join(catalog_dir, fh.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def artifact_is_fresh(path, csv_path=MOVIES_CSV):
+    """
+    Checks that an artifact has the current layout and was built from the
+    current movies.csv. The CSV is not checked when it is not deployed.
+    """
+    with open(os.path.join(path, "manifest.json"), encoding="utf8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    source = manifest.get("source") or {}
+    signature = csv_signature(csv_path)
+    return all(source.get(key) == signature[key] for key in ("size", "mtime_ns"))
+
+
+def source_stamp(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Identifies the files read_catalog() would load: the current artifact
+    build and the size and mtime of movies.csv.
+    """
+    csv = csv_signature(csv_path) if os.path.exists(csv_path) else {}
+    return current_artifact(catalog_dir), csv.get("size"), csv.get("mtime_ns")
+
+
+def read_deltas(catalog_dir=CATALOG_DIR, skip=()):
+    """
+    Returns (file name, records) of every rating delta file not in skip,
+    oldest first. A record cut short by a crash is ignored.
+    """
+    directory = os.path.join(catalog_dir, DELTAS)
+    if not os.path.isdir(directory):
+        return []
+    deltas = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl") or name in skip:
+            continue
+        records = []
+        with open(os.path.join(directory, name), encoding="utf8") as fh:
+            for line in fh:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        deltas.append((name, records))
+    return deltas
+
+
+def new_delta_path(catalog_dir=CATALOG_DIR):
+    """
+    Returns the path for a new rating delta file, named so that delta
+    files sort in the order they were written.
+    """
+    directory = os.path.join(catalog_dir, DELTAS)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"delta-{time.time_ns()}.jsonl")
+
+
+def publish(catalog, source, catalog_dir=CATALOG_DIR):
+    """
+    Saves catalog as a new artifact build, atomically makes it the current
+    one and prunes old builds. Returns the build directory.
+    """
+    name = f"build-{time.time_ns()}"
+    path = os.path.join(catalog_dir, name)
+    catalog.save(path, source)
+
+    pointer = os.path.join(catalog_dir, "CURRENT")
+    with open(pointer + ".tmp", "w", encoding="utf8") as fh:
+        fh.write(name)
+    os.replace(pointer + ".tmp", pointer)
+
+    builds = sorted(x for x in os.listdir(catalog_dir) if x.startswith("build-"))
+    for old in builds[:-KEEP_ARTIFACTS]:
+        shutil.rmtree(os.path.join(catalog_dir, old), ignore_errors=True)
+    return path
+
+
+def build_artifact(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Converts movies.csv plus the rating deltas into a new artifact build
+    and atomically makes it the current one. Returns the build directory.
+    """
+    catalog = MovieCatalog.from_csv(csv_path).with_deltas(read_deltas(catalog_dir))
+    return publish(catalog, csv_signature(csv_path), catalog_dir)
+
+
+def merge_deltas(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Applies the delta files the current artifact has not seen yet and
+    publishes the result as a new build, leaving movies.csv untouched.
+    Returns the new build directory, or None when there was nothing to merge.
+    """
+    path = current_artifact(catalog_dir)
+    if path is None or not artifact_is_fresh(path, csv_path):
+        return build_artifact(csv_path, catalog_dir)
+    catalog = MovieCatalog.from_artifact(path)
+    deltas = read_deltas(catalog_dir, skip=set(catalog.deltas))
+    if not deltas:
+        return None
+    with open(os.path.join(path, "manifest.json"), encoding="utf8") as fh:
+        source = json.load(fh).get("source")
+    return publish(catalog.with_deltas(deltas), source, catalog_dir)
+
+
+def read_catalog(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Loads the current artifact when it matches movies.csv, otherwise
+    parses the CSV and applies the rating deltas.
+    """
+    path = current_artifact(catalog_dir)
+    if path is not None and artifact_is_fresh(path, csv_path):
+        return MovieCatalog.from_artifact(path)
+    return MovieCatalog.from_csv(csv_path).with_deltas(read_deltas(catalog_dir))
+
+
+_index_builders = {}
+_catalog = None
+_catalog_lock = threading.Lock()
+# held while a new catalog version is built, so builds never overlap
+_build_lock = threading.Lock()
+_versions = itertools.count(1)
+_reload_listeners = []
+_reloader = None
+_last_error = None
+
+
+def register_index(name, builder):
+    """
+    Registers a structure derived from the catalog, such as the search
+    index. builder(catalog) runs once per catalog version, before a reloaded
+    catalog is swapped in, so readers see a catalog and its indexes together.
+    """
+    _index_builders[name] = builder
+
+
+def on_reload(listener):
+    """
+    Registers a function called with the new catalog after every reload,
+    used to invalidate state derived from the previous catalog.
+    """
+    _reload_listeners.append(listener)
+
+
+def build_catalog(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Reads the catalog and builds its registered indexes, without making it
+    the process-wide one.
+    """
+    started = time.perf_counter()
+    # taken first, so files changing during the build trigger another one
+    stamp = source_stamp(csv_path, catalog_dir)
+    catalog = read_catalog(csv_path, catalog_dir)
+    catalog.build_indexes()
+    catalog.stamp = stamp
+    catalog.build_seconds = time.perf_counter() - started
+    return catalog
+
+
+def _install(catalog):
+    """
+    Makes catalog the process-wide one. Callers hold _build_lock.
+    """
+    global _catalog  # pylint: disable=global-statement
+    with _catalog_lock:
+        catalog.version = next(_versions)
+        catalog.loaded_at = time.time()
+        _catalog = catalog
+    return catalog
+
+
+def load_catalog(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    (Re)loads the process-wide catalog from disk and returns it. The old
+    catalog keeps serving until the new one and its indexes are built.
+    """
+    with _build_lock:
+        catalog = _install(build_catalog(csv_path, catalog_dir))
+    for listener in _reload_listeners:
+        listener(catalog)
+    return catalog
+
+
+def refresh_catalog(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Reloads the process-wide catalog when movies.csv or the current
+    artifact build changed since it was read, e.g. after merge_deltas() ran
+    in another process. Returns True when it reloaded.
+    """
+    if source_stamp(csv_path, catalog_dir) == get_catalog().stamp:
+        return False
+    load_catalog(csv_path, catalog_dir)
+    return True
+
+
+def _reload(reload, csv_path, catalog_dir):
+    """
+    Runs load_catalog or refresh_catalog from a background thread, where an
+    error is recorded for catalog_status() instead of raised.
+    """
+    global _last_error  # pylint: disable=global-statement
+    try:
+        reload(csv_path, catalog_dir)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        _last_error = f"{type(e).__name__}: {e}"
+        print(f"Error reloading the movie catalog: {_last_error}")
+    else:
+        _last_error = None
+
+
+def reload_in_background(csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR):
+    """
+    Starts reloading the catalog in a background thread. Returns False,
+    without starting another one, when a reload is already running.
+    """
+    global _reloader  # pylint: disable=global-statement
+    with _catalog_lock:
+        if _reloader is not None and _reloader.is_alive():
+            return False
+        _reloader = threading.Thread(
+            target=_reload, args=(load_catalog, csv_path, catalog_dir), daemon=True
+        )
+        _reloader.start()
+    return True
+
+
+class CatalogWatcher(threading.Thread):
+    """
+    Daemon thread reloading the process-wide catalog whenever movies.csv or
+    the current artifact build changes
+    """
+
+    def __init__(
+        self, interval=WATCH_INTERVAL, csv_path=MOVIES_CSV, catalog_dir=CATALOG_DIR
+    ):
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.interval = interval
+        self.csv_path = csv_path
+        self.catalog_dir = catalog_dir
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            _reload(refresh_catalog, self.csv_path, self.catalog_dir)
+
+    def stop(self):
+        """
+        Makes the thread exit after its current check.
+        """
+        self._stopped.set()
+
+
+def get_catalog():
+    """
+    Returns the process-wide catalog, loading it on first use. The first
+    build is serialized with reloads, and readers only wait for it then.
+    """
+    with _catalog_lock:
+        catalog = _catalog
+    if catalog is not None:
+        return catalog
+    with _build_lock:
+        with _catalog_lock:
+            catalog = _catalog
+        if catalog is None:
+            # another thread may have loaded it while this one waited
+            catalog = _install(build_catalog())
+    return catalog
+
+
+def catalog_status():
+    """
+    Returns the version, origin and build time of the process-wide catalog
+    and the state of background reloads.
+    """
+    catalog = get_catalog()
+    return {
+        "version": catalog.version,
+        "size": catalog.size,
+        "artifact": catalog.path,
+        "build_seconds": catalog.build_seconds,
+        "loaded_at": catalog.loaded_at,
+        "reloading": _reloader is not None and _reloader.is_alive(),
+        "last_error": _last_error,
+    }
+
+
+def main(argv=None):
+    """
+    Command line entry point that builds the catalog artifact.
+    """
+    parser = argparse.ArgumentParser(description="Build the binary movie catalog")
+    parser.add_argument("--csv", default=MOVIES_CSV, help="source movies.csv")
+    parser.add_argument("--out", default=CATALOG_DIR, help="artifact directory")
+    args = parser.parse_args(argv)
+    print(f"Catalog artifact written to {build_artifact(args.csv, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,146 +5,196 @@ This code is licensed under MIT license (see LICENSE for details)
 @author: PopcornPicks
 """
 
-import os
-import pandas as pd
+import numpy as np
 
-app_dir = os.path.dirname(os.path.abspath(__file__))
-code_dir = os.path.dirname(app_dir)
-project_dir = os.path.dirname(code_dir)
+from src.prediction_scripts.cache import LRUCache
+from src.prediction_scripts.catalog import get_catalog, on_reload
 
+# Number of genre-ranked movies that are re-scored with people and IMDb rating
+CANDIDATE_POOL = 40000
+RESULT_SIZE = 201
+# Number of users whose genre scores are computed in one matrix product
+BATCH_SIZE = 128
 
-def recommend_for_new_user(user_rating, gw, dw, aw):
+# Bounds of the recommendation result cache
+CACHE_SIZE = 1024
+CACHE_TTL = 3600
+
+# (genre, director, actor) weights of each recommendation mode
+WEIGHTS = {
+    "genreBased": (1, 0, 0),
+    "dirBased": (0.1, 1, 0.1),
+    "actorBased": (0.1, 0.1, 1),
+    "all": (0.5, 0.3, 0.3),
+}
+
+recommendation_cache = LRUCache(CACHE_SIZE, CACHE_TTL)
+on_reload(lambda catalog: recommendation_cache.clear())
+
+
+def select_top(scores, k):
     """
-    Generates a list of recommended movie titles for a new user based on their ratings.
+    Returns the positions of the k highest scores in no particular order.
+    Uses partial selection, so the cost is linear in len(scores).
+    NaN scores rank last and ties are broken by position.
     """
-    # ratings = pd.read_csv(os.path.join(project_dir, "data", "ratings.csv"))
-    movies = pd.read_csv(os.path.join(project_dir, "data", "movies.csv"))
-    user = pd.DataFrame(user_rating)
-    user_movie_id = movies[movies["title"].isin(user["title"])]
-    user_ratings = pd.merge(user_movie_id, user)
-
-    movies_genre_filled = movies.copy(deep=True)
-    copy_of_movies = movies.copy(deep=True)
-
-    for index, row in copy_of_movies.iterrows():
-        copy_of_movies.at[index, "genres"] = row["genres"].split("|")
-
-    for index, row in copy_of_movies.iterrows():
-        for genre in row["genres"]:
-            movies_genre_filled.at[index, genre] = 1
-
-    movies_genre_filled = movies_genre_filled.fillna(0)
-
-    user_genre = movies_genre_filled[
-        movies_genre_filled.movieId.isin(user_ratings.movieId)
-    ]
-    user_genre.drop(
-        [
-            "movieId",
-            "title",
-            "genres",
-            "imdb_id",
-            "overview",
-            "poster_path",
-            "runtime",
-            "director",
-            "actors",
-            "imdb_ratings",
-        ],
-        axis=1,
-        inplace=True,
-    )
-    user_profile = user_genre.T.dot(user_ratings.rating.to_numpy())
-
-    movies_genre_filled.set_index(movies_genre_filled.movieId)
-    movies_genre_filled.drop(
-        [
-            "movieId",
-            "title",
-            "genres",
-            "imdb_id",
-            "overview",
-            "poster_path",
-            "runtime",
-            "director",
-            "actors",
-            "imdb_ratings",
-        ],
-        axis=1,
-        inplace=True,
-    )
+    keys = np.where(np.isnan(scores), np.inf, -scores)
+    if k >= len(keys):
+        return np.arange(len(keys))
+    kth = np.partition(keys, k - 1)[k - 1]
+    better = np.flatnonzero(keys < kth)
+    tied = np.flatnonzero(keys == kth)[: k - len(better)]
+    return np.concatenate([better, tied])
 
-    recommendations = (movies_genre_filled.dot(user_profile)) / user_profile.sum()
 
-    join_movies_and_recommendations = movies.copy(deep=True)
-    join_movies_and_recommendations["recommended"] = recommendations
-    join_movies_and_recommendations.sort_values(
-        by="recommended", ascending=False, inplace=True
-    )
+def top_k(scores, k):
+    """
+    Returns the positions of the k highest scores, best first.
+    """
+    selected = select_top(scores, k)
+    keys = np.where(np.isnan(scores[selected]), np.inf, -scores[selected])
+    return selected[np.lexsort((selected, keys))]
 
-    top_recommendations = join_movies_and_recommendations.head(40000)
 
-    # Calculate director and actor matching scores for top recommendations
-    user_directors = set(
-        director for movie in user_movie_id["director"] for director in movie.split(",")
-    )
-    user_actors = set(
-        actor for movie in user_movie_id["actors"] for actor in movie.split(",")
-    )
+def user_profile(catalog, user_rating):
+    """
+    Returns the catalog rows of the movies a user rated and the user's
+    rating-weighted genre profile.
+    """
+    row_ratings = {}
+    for movie in user_rating:
+        for row in catalog.title_rows.get(movie["title"], ()):
+            row_ratings[row] = row_ratings.get(row, 0.0) + float(movie["rating"])
+    user_rows = np.array(sorted(row_ratings), dtype=np.intp)
+    ratings = np.array([row_ratings[row] for row in user_rows])
+    return user_rows, catalog.genre_matrix[user_rows].T.dot(ratings)
 
-    # Score based on overlap with user's favorite directors and actors
-    top_recommendations["director_match_score"] = top_recommendations["director"].apply(
-        lambda directors: len(set(directors.split(",")).intersection(user_directors))
-    )
-    top_recommendations["actor_match_score"] = top_recommendations["actors"].apply(
-        lambda actors: len(set(actors.split(",")).intersection(user_actors))
-    )
 
-    # Normalize IMDb rating and add it as a score component
-    top_recommendations["imdb_ratings"] = top_recommendations["imdb_ratings"].replace(
-        "Error", "1.0"
-    )
-    top_recommendations["imdb_ratings"] = top_recommendations["imdb_ratings"].replace(
-        "No Rating Found", "1.0"
-    )
+def rank_candidates(catalog, recommended, user_rows, weights, k):
+    """
+    Re-scores the best genre matches with director, actor and IMDb rating
+    scores and returns the rows of the top k movies the user has not seen.
+    """
+    gw, dw, aw = weights
+    candidates = select_top(recommended, CANDIDATE_POOL)
 
-    max_imdb_rating = top_recommendations["imdb_ratings"].astype(float).max()
-    top_recommendations["normalized_imdb_rating"] = (
-        top_recommendations["imdb_ratings"].astype(float) / max_imdb_rating
-    )
+    # Score based on overlap with user's favorite directors and actors
+    directors = catalog.directors
+    actors = catalog.actors
+    director_match_score = directors.match_scores(directors.people_of(user_rows))
+    actor_match_score = actors.match_scores(actors.people_of(user_rows))
+
+    # Normalize IMDb rating among the candidates and add it as a score component
+    imdb_ratings = catalog.normalized_ratings[candidates]
+    normalized_imdb_rating = imdb_ratings / imdb_ratings.max()
 
     # Increase weights for director, actor scores, and IMDb rating in the final recommendation score
-    top_recommendations["final_score"] = (
-        gw * top_recommendations["recommended"]
-        + dw * top_recommendations["director_match_score"]
-        + aw * top_recommendations["actor_match_score"]
-        + 0.4 * top_recommendations["normalized_imdb_rating"]
+    final_score = (
+        gw * recommended[candidates]
+        + dw * director_match_score[candidates]
+        + aw * actor_match_score[candidates]
+        + 0.4 * normalized_imdb_rating
     )
 
-    top_recommendations.sort_values(by="final_score", ascending=False, inplace=True)
-    print(user["title"])
-    top_recommendations = top_recommendations[
-        ~top_recommendations["title"].isin(user["title"])
-    ]
+    # Drop the movies the user already picked before selecting the top k
+    seen = np.zeros(catalog.size, dtype=bool)
+    seen[user_rows] = True
+    unseen = ~seen[candidates]
+    candidates, final_score = candidates[unseen], final_score[unseen]
+    return candidates[top_k(final_score, k)]
 
+
+def movie_lists(catalog, rows):
+    """
+    Returns the titles, genres and imdb ids of the given rows.
+    """
     return (
-        list(top_recommendations["title"][:201]),
-        list(top_recommendations["genres"][:201]),
-        list(top_recommendations["imdb_id"][:201]),
+        catalog.titles[rows].tolist(),
+        catalog.genres[rows].tolist(),
+        catalog.imdb_ids[rows].tolist(),
     )
 
 
-def recommend_for_new_user_g(user_rating):
-    return recommend_for_new_user(user_rating, 1, 0, 0)
+def recommend_for_new_user(user_rating, gw, dw, aw, k=RESULT_SIZE, catalog=None):
+    """
+    Generates a list of recommended movie titles for a new user based on their ratings.
+    :param k: number of recommendations to return
+    :param catalog: MovieCatalog to recommend from, the process-wide one when None
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    user_rows, profile = user_profile(catalog, user_rating)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        recommended = catalog.genre_matrix.dot(profile) / profile.sum()
+    top = rank_candidates(catalog, recommended, user_rows, (gw, dw, aw), k)
+    return movie_lists(catalog, top)
+
+
+def recommendation_key(catalog, user_rating, weights, k):
+    """
+    Cache key of a request: the sorted seed movies, the weight triple, k and
+    the catalog version the result was computed on. A repeated seed counts
+    again in the user's profile, so it is kept in the key as well.
+    """
+    seeds = sorted((movie["title"], float(movie["rating"])) for movie in user_rating)
+    return catalog.version, tuple(seeds), tuple(weights), k
+
+
+def recommend(user_rating, weights, k=RESULT_SIZE):
+    """
+    Cached front of recommend_for_new_user.
+    Repeated seed sets are answered from recommendation_cache.
+    """
+    # the cache key and the result come from the same catalog version
+    catalog = get_catalog()
+    key = recommendation_key(catalog, user_rating, weights, k)
+    result = recommendation_cache.get(key)
+    if result is None:
+        result = recommend_for_new_user(user_rating, *weights, k, catalog)
+        recommendation_cache.put(key, tuple(tuple(column) for column in result))
+        return result
+    return tuple(list(column) for column in result)
+
+
+def recommend_batch(list_of_user_ratings, weights, k=RESULT_SIZE):
+    """
+    Generates recommendations for many users at once.
+    The genre scores of up to BATCH_SIZE users are computed with a single
+    matrix-matrix product.
+    :param list_of_user_ratings: one user_rating list per user
+    :param weights: (gw, dw, aw) triple used for every user
+    :param k: number of recommendations to return per user
+    :return: one (titles, genres, imdb_ids) tuple per user
+    """
+    catalog = get_catalog()
+    results = []
+    for start in range(0, len(list_of_user_ratings), BATCH_SIZE):
+        users = [
+            user_profile(catalog, user_rating)
+            for user_rating in list_of_user_ratings[start : start + BATCH_SIZE]
+        ]
+        profiles = np.array([profile for _, profile in users])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            recommended = catalog.genre_matrix.dot(profiles.T) / profiles.sum(axis=1)
+        for column, (user_rows, _) in enumerate(users):
+            top = rank_candidates(
+                catalog, recommended[:, column], user_rows, weights, k
+            )
+            results.append(movie_lists(catalog, top))
+    return results
+
+
+def recommend_for_new_user_g(user_rating, k=RESULT_SIZE):
+    return recommend(user_rating, WEIGHTS["genreBased"], k)
 
 
-def recommend_for_new_user_d(user_rating):
-    return recommend_for_new_user(user_rating, 0.1, 1, 0.1)
+def recommend_for_new_user_d(user_rating, k=RESULT_SIZE):
+    return recommend(user_rating, WEIGHTS["dirBased"], k)
 
 
-def recommend_for_new_user_a(user_rating):
-    return recommend_for_new_user(user_rating, 0.1, 0.1, 1)
+def recommend_for_new_user_a(user_rating, k=RESULT_SIZE):
+    return recommend(user_rating, WEIGHTS["actorBased"], k)
 
 
-def recommend_for_new_user_all(user_rating):
-    return recommend_for_new_user(user_rating, 0.5, 0.3, 0.3)
+def recommend_for_new_user_all(user_rating, k=RESULT_SIZE):
+    return recommend(user_rating, WEIGHTS["all"], k)
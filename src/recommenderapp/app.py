@@ -9,12 +9,11 @@ This code is licensed under MIT license (see LICENSE for details)
 # pylint: disable=import-error
 import json
 import sys
-import os
+import signal
+import time
 from flask import Flask, jsonify, render_template, request, g
 from flask_cors import CORS
-import mysql.connector
 import requests
-from dotenv import load_dotenv
 
 sys.path.append("../../")
 from src.recommenderapp.utils import (
@@ -23,24 +22,46 @@ from src.recommenderapp.utils import (
     create_account,
     login_to_account,
     submit_review,
-    get_wall_posts,
+    get_wall_page,
+    WALL_PAGE_SIZE,
     get_recent_movies,
     get_username,
     add_friend,
     get_friends,
     get_recent_friend_movies,
-    add_to_watchlist,
+    add_to_watchlist_by_movie,
     get_imdb_id_by_name,
     add_to_watched_history,
     remove_from_watched_history_util,
     create_or_update_discussion,
     get_discussion,
+    DISCUSSION_PAGE_SIZE,
     get_username_data,
     remove_from_watchlist,
+    bulk_add_to_list,
+    bulk_remove_from_list,
+    WATCHLIST_QUERY,
+    WATCHED_HISTORY_QUERY,
 )
-from src.recommenderapp.search import Search
+from src.prediction_scripts.cache import LRUCache
+from src.recommenderapp.search import Search, SUGGESTIONS
+from src.recommenderapp.db import ConnectionPool
+from src.recommenderapp.http_client import HttpClient
+from src.recommenderapp.metadata import MetadataCache, MetadataUnavailable, summarize
+from src.recommenderapp.settings import Settings
 from datetime import datetime
+from src.prediction_scripts.catalog import (
+    CatalogWatcher,
+    catalog_status,
+    get_catalog,
+    reload_in_background,
+)
 from src.prediction_scripts.item_based import (
+    RESULT_SIZE,
+    WEIGHTS,
+    recommend_batch,
+    recommendation_cache,
+    recommend_for_new_user,
     recommend_for_new_user_g,
     recommend_for_new_user_d,
     recommend_for_new_user_a,
@@ -56,6 +77,173 @@ app.secret_key = "secret key"
 cors = CORS(app, resources={r"/*": {"origins": "*"}})
 user = {1: None}
 comments: []
+# One search service per process; its index is built on first use
+search_service = Search()
+
+
+def pool_config(settings):
+    """
+    Returns the part of settings the connection pool is built from.
+    """
+    return settings.db_connection(), settings.db_pool_size, settings.db_pool_timeout
+
+
+def metadata_config(settings):
+    """
+    Returns the part of settings the OMDB metadata cache and its HTTP client
+    are built from.
+    """
+    return tuple(
+        getattr(settings, name)
+        for name in (
+            "omdb_api_key",
+            "omdb_url",
+            "omdb_fetch_workers",
+            "http_connect_timeout",
+            "http_read_timeout",
+            "http_max_concurrency",
+            "http_retries",
+            "http_backoff",
+            "omdb_cache_path",
+            "omdb_cache_size",
+            "omdb_cache_ttl",
+            "omdb_negative_ttl",
+        )
+    )
+
+
+# First pages of the wall, per page size and include flag; later pages are
+# cheap keyset reads and are not cached
+wall_cache = LRUCache(maxsize=16)
+
+
+def configure(settings):
+    """
+    Installs settings on the app and applies them to the pool and caches.
+    The pool is only replaced when its configuration changed.
+    """
+    previous = app.config.get("SETTINGS")
+    app.config["SETTINGS"] = settings
+    if previous is None or pool_config(previous) != pool_config(settings):
+        old_pool = app.config.get("DB_POOL")
+        # Connections are opened on the first checkout, not here
+        app.config["DB_POOL"] = ConnectionPool.from_settings(settings)
+        if old_pool is not None:
+            # requests still holding its connections disconnect them on release
+            old_pool.close()
+    if previous is None or metadata_config(previous) != metadata_config(settings):
+        old_client = app.config.get("HTTP_CLIENT")
+        old_metadata = app.config.get("METADATA")
+        app.config["HTTP_CLIENT"] = HttpClient.from_settings(settings)
+        app.config["METADATA"] = MetadataCache.from_settings(
+            settings, app.config["HTTP_CLIENT"]
+        )
+        if old_client is not None:
+            old_client.close()
+            old_metadata.store.close()
+    recommendation_cache.configure(
+        settings.recommendation_cache_size, settings.recommendation_cache_ttl
+    )
+    wall_cache.configure(wall_cache.maxsize, settings.wall_cache_ttl)
+
+
+def reload_settings(*_):
+    """
+    Re-reads the environment and .env file; also the SIGHUP handler.
+    """
+    configure(Settings.from_env())
+
+
+def current_settings():
+    """
+    Returns the settings the app is running with.
+    """
+    return app.config["SETTINGS"]
+
+
+configure(Settings.from_env())
+
+# Outcome of every warm_up() step: ready, seconds taken and error
+readiness = {}
+
+
+def warm_up_recommender():
+    """
+    Runs one uncached recommendation so the scoring code and the pages of
+    the catalog arrays are loaded.
+    """
+    catalog = get_catalog()
+    if catalog.size:
+        seed = [{"title": catalog.titles[0], "rating": 5}]
+        recommend_for_new_user(seed, *WEIGHTS["all"], catalog=catalog)
+
+
+# Steps of warm_up(), in order; the catalog step also builds the search index
+WARM_UP_STEPS = (
+    ("catalog", get_catalog),
+    ("search", lambda: search_service.suggest("the", "titleBased")),
+    ("recommender", warm_up_recommender),
+    ("metadata", lambda: app.config["METADATA"].warm()),
+)
+
+
+def warm_up():
+    """
+    Builds the catalog, search index, recommender and metadata cache before
+    the app serves traffic, recording each step in readiness.
+    Returns True when every step succeeded.
+    """
+    for name, step in WARM_UP_STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            readiness[name] = {"ready": False, "error": f"{type(e).__name__}: {e}"}
+        else:
+            readiness[name] = {"ready": True, "error": None}
+        readiness[name]["seconds"] = time.perf_counter() - started
+    return all(component["ready"] for component in readiness.values())
+
+
+# Number of recommendations returned when the client does not ask for k
+DEFAULT_RECOMMENDATIONS = 10
+# Largest number of movie lists accepted by /batch
+MAX_BATCH_LISTS = 1000
+# Largest number of suggestions returned by /search
+MAX_SEARCH_LIMIT = 100
+# Largest number of imdb ids accepted by /movies/metadata
+MAX_METADATA_IDS = 100
+# Largest page of comments returned by /movieDiscussion/<id>
+MAX_DISCUSSION_PAGE = 100
+# Largest page of posts returned by /getWallData
+MAX_WALL_PAGE = 100
+# Largest number of movies accepted by the bulk list endpoints
+MAX_BULK_MOVIES = 1000
+
+
+def get_result_count(data):
+    """
+    Reads the optional number of recommendations (k) requested by the client.
+    Returns None when k is invalid.
+    """
+    k = data.get("k", DEFAULT_RECOMMENDATIONS)
+    if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= RESULT_SIZE:
+        return None
+    return k
+
+
+def get_search_limit(form):
+    """
+    Reads the optional number of search suggestions (limit) from the form.
+    Returns None when limit is invalid.
+    """
+    try:
+        limit = int(form.get("limit", SUGGESTIONS))
+    except ValueError:
+        return None
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return None
+    return limit
 
 
 @app.route("/")
@@ -127,15 +315,16 @@ def predict_g():
     data1 = data["movie_list"]
     if not data1:
         return jsonify({"error": "No movies provided"}), 400
+    k = get_result_count(data)
+    if k is None:
+        return jsonify({"error": f"k must be an integer from 1 to {RESULT_SIZE}"}), 400
     training_data = []
     for movie in data1:
         movie_with_rating = {"title": movie, "rating": 5.0}
         if movie_with_rating not in training_data:
             training_data.append(movie_with_rating)
-    recommendations, genres, imdb_id = recommend_for_new_user_g(training_data)
-    recommendations, genres, imdb_id = recommendations[:10], genres[:10], imdb_id[:10]
+    recommendations, genres, imdb_id = recommend_for_new_user_g(training_data, k)
     resp = {"recommendations": recommendations, "genres": genres, "imdb_id": imdb_id}
-    print(resp)
     return resp
 
 
@@ -150,13 +339,15 @@ def predict_d():
     data1 = data["movie_list"]
     if not data1:
         return jsonify({"error": "No movies provided"}), 400
+    k = get_result_count(data)
+    if k is None:
+        return jsonify({"error": f"k must be an integer from 1 to {RESULT_SIZE}"}), 400
     training_data = []
     for movie in data1:
         movie_with_rating = {"title": movie, "rating": 5.0}
         if movie_with_rating not in training_data:
             training_data.append(movie_with_rating)
-    recommendations, genres, imdb_id = recommend_for_new_user_d(training_data)
-    recommendations, genres, imdb_id = recommendations[:10], genres[:10], imdb_id[:10]
+    recommendations, genres, imdb_id = recommend_for_new_user_d(training_data, k)
     resp = {"recommendations": recommendations, "genres": genres, "imdb_id": imdb_id}
     return resp
 
@@ -172,13 +363,15 @@ def predict_a():
     data1 = data["movie_list"]
     if not data1:
         return jsonify({"error": "No movies provided"}), 400
+    k = get_result_count(data)
+    if k is None:
+        return jsonify({"error": f"k must be an integer from 1 to {RESULT_SIZE}"}), 400
     training_data = []
     for movie in data1:
         movie_with_rating = {"title": movie, "rating": 5.0}
         if movie_with_rating not in training_data:
             training_data.append(movie_with_rating)
-    recommendations, genres, imdb_id = recommend_for_new_user_a(training_data)
-    recommendations, genres, imdb_id = recommendations[:10], genres[:10], imdb_id[:10]
+    recommendations, genres, imdb_id = recommend_for_new_user_a(training_data, k)
     resp = {"recommendations": recommendations, "genres": genres, "imdb_id": imdb_id}
     return resp
 
@@ -194,17 +387,56 @@ def predict_all():
     data1 = data["movie_list"]
     if not data1:
         return jsonify({"error": "No movies provided"}), 400
+    k = get_result_count(data)
+    if k is None:
+        return jsonify({"error": f"k must be an integer from 1 to {RESULT_SIZE}"}), 400
     training_data = []
     for movie in data1:
         movie_with_rating = {"title": movie, "rating": 5.0}
         if movie_with_rating not in training_data:
             training_data.append(movie_with_rating)
-    recommendations, genres, imdb_id = recommend_for_new_user_all(training_data)
-    recommendations, genres, imdb_id = recommendations[:10], genres[:10], imdb_id[:10]
+    recommendations, genres, imdb_id = recommend_for_new_user_all(training_data, k)
     resp = {"recommendations": recommendations, "genres": genres, "imdb_id": imdb_id}
     return resp
 
 
+@app.route("/batch", methods=["POST"])
+def predict_batch():
+    """
+    Predicts movie recommendations for many movie lists in one call.
+    """
+    data = json.loads(request.data)
+    movie_lists = data.get("movie_lists")
+    if not isinstance(movie_lists, list) or not movie_lists:
+        return jsonify({"error": "no movie lists provided"}), 400
+    if len(movie_lists) > MAX_BATCH_LISTS:
+        return jsonify({"error": f"at most {MAX_BATCH_LISTS} movie lists"}), 400
+    if not all(isinstance(movies, list) and movies for movies in movie_lists):
+        return jsonify({"error": "No movies provided"}), 400
+    mode = data.get("mode", "all")
+    if mode not in WEIGHTS:
+        return jsonify({"error": "unknown recommendation mode"}), 400
+    k = get_result_count(data)
+    if k is None:
+        return jsonify({"error": f"k must be an integer from 1 to {RESULT_SIZE}"}), 400
+    training_data = []
+    for movies in movie_lists:
+        user_rating = []
+        for movie in movies:
+            movie_with_rating = {"title": movie, "rating": 5.0}
+            if movie_with_rating not in user_rating:
+                user_rating.append(movie_with_rating)
+        training_data.append(user_rating)
+    results = []
+    for recommendations, genres, imdb_id in recommend_batch(
+        training_data, WEIGHTS[mode], k
+    ):
+        results.append(
+            {"recommendations": recommendations, "genres": genres, "imdb_id": imdb_id}
+        )
+    return jsonify({"results": results})
+
+
 @app.route("/search", methods=["POST"])
 def search():
     """
@@ -212,13 +444,28 @@ def search():
     """
     term = request.form["q"]
     filter_term = request.form["filter"]
-    finder = Search()
-    filtered_dict = finder.results_top_ten(term, filter_term)
+    limit = get_search_limit(request.form)
+    if limit is None:
+        return (
+            jsonify(
+                {"error": f"limit must be an integer from 1 to {MAX_SEARCH_LIMIT}"}
+            ),
+            400,
+        )
+    filtered_dict = search_service.suggest(term, filter_term, limit)
     resp = jsonify(filtered_dict)
     resp.status_code = 200
     return resp
 
 
+@app.route("/search/stats", methods=["GET"])
+def search_stats():
+    """
+    Reports the size, build time and memory of the search index.
+    """
+    return jsonify(search_service.stats()), 200
+
+
 @app.route("/", methods=["POST"])
 def create_acc():
     """
@@ -227,7 +474,7 @@ def create_acc():
     data = json.loads(request.data)
     if not "email" in data or not "username" in data or not "password" in data:
         return jsonify({"error": "no email, username, or password provided"}), 400
-    create_account(g.db, data["email"], data["username"], data["password"])
+    create_account(get_db(), data["email"], data["username"], data["password"])
     return request.data
 
 
@@ -246,7 +493,7 @@ def login():
     Handles logging in the active user
     """
     data = json.loads(request.data)
-    resp = login_to_account(g.db, data["username"], data["password"])
+    resp = login_to_account(get_db(), data["username"], data["password"])
     if resp is None:
         return 400
     user[1] = resp
@@ -259,7 +506,7 @@ def friend():
     Handles adding a new friend
     """
     data = json.loads(request.data)
-    add_friend(g.db, data["username"], user[1])
+    add_friend(get_db(), data["username"], user[1])
     return request.data
 
 
@@ -282,17 +529,36 @@ def review():
     """
     data = request.get_json()
     movie_name = data.get("movie")
-    data["imdb_id"] = get_imdb_id_by_name(g.db, movie_name)
-    submit_review(g.db, user[1], movie_name, data.get("score"), data.get("review"))
+    data["imdb_id"] = get_imdb_id_by_name(get_db(), movie_name)
+    submit_review(get_db(), user[1], movie_name, data.get("score"), data.get("review"))
+    # the reviewer sees the new post right away
+    wall_cache.clear()
     return request.data
 
 
 @app.route("/getWallData", methods=["GET"])
 def wall_posts():
     """
-    Gets the posts for the wall
-    """
-    return get_wall_posts(g.db)
+    Gets a page of posts for the wall, newest first; the next_cursor of a
+    page is passed as before to get the older posts
+    """
+    try:
+        limit = int(request.args.get("limit", WALL_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_WALL_PAGE:
+        return jsonify({"error": "Invalid limit"}), 400
+    before = request.args.get("before")
+    if before is not None and not before.isdigit():
+        return jsonify({"error": "Invalid cursor"}), 400
+    key = (limit, request.args.get("include"))
+    page = wall_cache.get(key) if before is None else None
+    if page is None:
+        page = get_wall_page(get_db(), limit, before)
+        page["posts"] = with_metadata(page["posts"])
+        if before is None:
+            wall_cache.put(key, page)
+    return jsonify(page)
 
 
 @app.route("/getRecentMovies", methods=["GET"])
@@ -300,7 +566,7 @@ def recent_movies():
     """
     Gets the recent movies of the active user
     """
-    return get_recent_movies(g.db, user[1])
+    return get_recent_movies(get_db(), user[1])
 
 
 @app.route("/getRecentFriendMovies", methods=["POST"])
@@ -309,7 +575,7 @@ def recent_friend_movies():
     Gets the recent movies of a certain friend
     """
     data = json.loads(request.data)
-    return get_recent_friend_movies(g.db, str(data))
+    return get_recent_friend_movies(get_db(), str(data))
 
 
 @app.route("/getUserName", methods=["GET"])
@@ -319,7 +585,7 @@ def username():
     """
     if user[1] == "guest":
         return jsonify("guest")
-    return get_username(g.db, user[1])
+    return get_username(get_db(), user[1])
 
 
 @app.route("/getFriends", methods=["GET"])
@@ -327,7 +593,7 @@ def get_friend():
     """
     Gets the friends of the active user
     """
-    return get_friends(g.db, user[1])
+    return get_friends(get_db(), user[1])
 
 
 @app.route("/feedback", methods=["POST"])
@@ -356,40 +622,74 @@ def add_movie_to_watchlist():
     Adds a movie to the user's watchlist.
     """
     data = request.get_json()
-    print(data)
     movie_name = data.get("movieName")
-    print(movie_name)
-    imdb_id = (
-        get_imdb_id_by_name(g.db, movie_name) if movie_name else data.get("imdb_id")
-    )
-    print("Got imdb id")
-    if not imdb_id:
+    imdb_id = None if movie_name else data.get("imdb_id")
+    if not (movie_name or imdb_id):
         return jsonify({"status": "error", "message": "Movie not found"}), 404
-    print("imdb id is present")
-
-    cursor = g.db.cursor()
-    cursor.execute("SELECT idMovies FROM Movies WHERE imdb_id = %s", [imdb_id])
-    movie_id_result = cursor.fetchone()
-    print("Selected movie.")
-    if movie_id_result:
-        movie_id = movie_id_result[0]
-        user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
-        print("Before was added.")
-        # Add to watchlist and check if it was added successfully
-        was_added = add_to_watchlist(g.db, user_id, movie_id)
-        print(was_added)
-        if was_added:
-            return (
-                jsonify({"status": "success", "message": "Movie added to watchlist"}),
-                200,
-            )
-        else:
-            return (
-                jsonify({"status": "info", "message": "Movie already in watchlist"}),
-                200,
-            )
-    else:
-        return jsonify({"status": "error", "message": "Movie not found"}), 404
+    user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
+    was_added = add_to_watchlist_by_movie(get_db(), user_id, imdb_id, movie_name)
+    if was_added is None:
+        return jsonify({"status": "error", "message": "Movie not found"}), 404
+    if was_added:
+        return (
+            jsonify({"status": "success", "message": "Movie added to watchlist"}),
+            200,
+        )
+    return jsonify({"status": "info", "message": "Movie already in watchlist"}), 200
+
+
+def get_bulk_movies():
+    """
+    Returns the imdb ids or titles of a bulk list request, None when they are
+    not a list of 1 to MAX_BULK_MOVIES non-empty strings.
+    """
+    movies = (request.get_json(silent=True) or {}).get("movies")
+    if (
+        not isinstance(movies, list)
+        or not 1 <= len(movies) <= MAX_BULK_MOVIES
+        or not all(isinstance(movie, str) and movie for movie in movies)
+    ):
+        return None
+    return movies
+
+
+def bulk_movies_error():
+    """
+    Response to a bulk list request without valid movies.
+    """
+    return (
+        jsonify(
+            {
+                "error": f"movies must be a list of 1 to {MAX_BULK_MOVIES} "
+                "imdb ids or titles"
+            }
+        ),
+        400,
+    )
+
+
+@app.route("/add_to_watchlist/bulk", methods=["POST"])
+def bulk_add_to_watchlist():
+    """
+    Adds many movies, given by imdb id or title, to the user's watchlist.
+    """
+    movies = get_bulk_movies()
+    if movies is None:
+        return bulk_movies_error()
+    results = bulk_add_to_list(get_db(), "Watchlist", "time", user[1], movies)
+    return jsonify({"results": results}), 200
+
+
+@app.route("/remove_from_watchlist/bulk", methods=["POST"])
+def bulk_remove_from_watchlist():
+    """
+    Removes many movies, given by imdb id or title, from the user's watchlist.
+    """
+    movies = get_bulk_movies()
+    if movies is None:
+        return bulk_movies_error()
+    results = bulk_remove_from_list(get_db(), "Watchlist", user[1], movies)
+    return jsonify({"results": results}), 200
 
 
 @app.route("/watchlist", methods=["GET"])
@@ -408,19 +708,10 @@ def get_watchlist():
     Retrieves the current user's watchlist.
     """
     user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
-    cursor = g.db.cursor(dictionary=True)
-    cursor.execute(
-        """
-        SELECT m.name, m.imdb_id, w.time
-        FROM Watchlist w
-        JOIN Movies m ON w.movie_id = m.idMovies
-        WHERE w.user_id = %s
-        ORDER BY w.time DESC;
-        """,
-        [user_id],
-    )
+    cursor = get_db().cursor(dictionary=True)
+    cursor.execute(WATCHLIST_QUERY, [user_id])
     watchlist = cursor.fetchall()
-    return jsonify(watchlist), 200
+    return jsonify(with_metadata(watchlist)), 200
 
 
 @app.route("/deleteWatchlistData", methods=["POST"])
@@ -430,7 +721,7 @@ def delete_watchlist_data():
     """
     user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
     imdb_id = json.loads(request.data)
-    idMovies, _ = remove_from_watchlist(g.db, user_id, imdb_id)
+    idMovies, _ = remove_from_watchlist(get_db(), user_id, imdb_id)
 
     if idMovies:
         return (
@@ -452,7 +743,7 @@ def get_api_key():
     Provides the OMDB API key securely to the frontend.
     """
     if user[1] is not None:
-        return jsonify({"apikey": os.getenv("OMDB_API_KEY")})
+        return jsonify({"apikey": current_settings().omdb_api_key})
     return jsonify({"error": "Unauthorized"}), 403
 
 
@@ -462,7 +753,7 @@ def get_api_key_streaming():
     Provides the Streaming Services API key to the frontend
     """
     if user[1] is not None:
-        return jsonify({"apikey": os.getenv("STREAMING_API_KEY")})
+        return jsonify({"apikey": current_settings().streaming_api_key})
     return jsonify({"error": "Unauthorized"}), 403
 
 
@@ -471,30 +762,59 @@ def add_movie_to_watched_history():
     """
     Adds a movie to the user's watched history.
     """
-    print("Entered add_to_watched_history function")
     data = request.get_json()
-    print("Request data:", data)
 
     # Get IMDb ID or movie name
     imdb_id = data.get("imdb_id")
-    if not imdb_id:
-        movie_name = data.get("movieName")
-        imdb_id = get_imdb_id_by_name(g.db, movie_name) if movie_name else None
-
-    if not imdb_id:
+    movie_name = None if imdb_id else data.get("movieName")
+    if not (imdb_id or movie_name):
         return jsonify({"status": "error", "message": "Movie not found"}), 404
 
-    print("IMDb ID obtained:", imdb_id)
     user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
 
     # Call utility function to add the movie
     was_added, message = add_to_watched_history(
-        g.db, user_id, imdb_id, data.get("watched_date")
+        get_db(), user_id, imdb_id, data.get("watched_date"), movie_name
     )
+    if movie_name and message == "Movie not found":
+        # an unknown title is an error, an unknown imdb_id is reported as info
+        return jsonify({"status": "error", "message": message}), 404
     status = "success" if was_added else "info"
     return jsonify({"status": status, "message": message}), 200
 
 
+@app.route("/add_to_watched_history/bulk", methods=["POST"])
+def bulk_add_to_watched_history():
+    """
+    Adds many movies, given by imdb id or title, to the user's watched history.
+    """
+    movies = get_bulk_movies()
+    if movies is None:
+        return bulk_movies_error()
+    results = bulk_add_to_list(
+        get_db(),
+        "WatchedHistory",
+        "watched_date",
+        user[1],
+        movies,
+        request.get_json().get("watched_date"),
+    )
+    return jsonify({"results": results}), 200
+
+
+@app.route("/remove_from_watched_history/bulk", methods=["POST"])
+def bulk_remove_from_watched_history():
+    """
+    Removes many movies, given by imdb id or title, from the user's watched
+    history.
+    """
+    movies = get_bulk_movies()
+    if movies is None:
+        return bulk_movies_error()
+    results = bulk_remove_from_list(get_db(), "WatchedHistory", user[1], movies)
+    return jsonify({"results": results}), 200
+
+
 @app.route("/watched_history", methods=["GET"])
 def watched_history_page():
     """
@@ -511,19 +831,10 @@ def get_watched_history():
     Retrieves the current user's watched history.
     """
     user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
-    cursor = g.db.cursor(dictionary=True)
-    cursor.execute(
-        """
-        SELECT m.name AS movie_name, m.imdb_id, wh.watched_date
-        FROM WatchedHistory wh
-        JOIN Movies m ON wh.movie_id = m.idMovies
-        WHERE wh.user_id = %s
-        ORDER BY wh.watched_date DESC;
-        """,
-        [user_id],
-    )
+    cursor = get_db().cursor(dictionary=True)
+    cursor.execute(WATCHED_HISTORY_QUERY, [user_id])
     watched_history = cursor.fetchall()
-    return jsonify(watched_history), 200
+    return jsonify(with_metadata(watched_history)), 200
 
 
 @app.route("/removeFromWatchedHistory", methods=["POST"])
@@ -542,7 +853,7 @@ def remove_from_watched_history():
     user_id = user[1]  # Assuming 'user' holds the currently logged-in user's ID
 
     # Call utility function to remove the movie
-    was_removed, message = remove_from_watched_history_util(g.db, user_id, imdb_id)
+    was_removed, message = remove_from_watched_history_util(get_db(), user_id, imdb_id)
     status = "success" if was_removed else "error"
     return jsonify({"status": status, "message": message}), 200
 
@@ -565,23 +876,88 @@ def moviePage(id):
     if user_id is None or user_id == "guest":
         us = "Anonymous"
     else:
-        us = get_username_data(g.db, user_id)
-    r = requests.get(
-        "http://www.omdbapi.com/", params={"i": id, "apikey": os.getenv("OMDB_API_KEY")}
-    )
-    resp = r.json()
-    if "Error" in resp:
+        us = get_username_data(get_db(), user_id)
+    try:
+        movie_data = app.config["METADATA"].get(id)
+    except MetadataUnavailable:
+        # OMDB refused the request (bad key, quota), answered as before
+        return jsonify({"error": "Movie not found"}), 404
+    except (requests.RequestException, ValueError):
+        return jsonify({"error": "Movie details are unavailable"}), 502
+    if movie_data is None:
         return jsonify({"error": "Movie not found"}), 404
-    data = {"movieData": r.json(), "user": us}
+    data = {"movieData": movie_data, "user": us}
     return render_template("movie.html", data=data)
 
 
+def with_metadata(rows):
+    """
+    Adds the summarized OMDB metadata of each row's imdb_id under "metadata"
+    when the request asks for include=metadata. Like /movies/metadata, OMDB
+    is asked about the first MAX_METADATA_IDS movies at most; later rows only
+    get cached entries. Rows without metadata get None.
+    """
+    if request.args.get("include") == "metadata":
+        metadata = app.config["METADATA"]
+        imdb_ids = list(dict.fromkeys(row["imdb_id"] for row in rows))
+        movies, _ = metadata.get_many(imdb_ids[:MAX_METADATA_IDS])
+        for imdb_id in imdb_ids[MAX_METADATA_IDS:]:
+            entry = metadata.cached(imdb_id)
+            if entry is not None:
+                movies[imdb_id] = entry[0]
+        for row in rows:
+            row["metadata"] = summarize(movies.get(row["imdb_id"]))
+    return rows
+
+
+@app.route("/movies/metadata", methods=["POST"])
+def movies_metadata():
+    """
+    Returns the summarized OMDB metadata of a list of imdb ids in one response
+    """
+    data = request.get_json(silent=True) or {}
+    imdb_ids = data.get("imdb_ids")
+    if (
+        not isinstance(imdb_ids, list)
+        or not imdb_ids
+        or not all(isinstance(imdb_id, str) for imdb_id in imdb_ids)
+    ):
+        return jsonify({"error": "imdb_ids must be a non-empty list of strings"}), 400
+    if len(imdb_ids) > MAX_METADATA_IDS:
+        return (
+            jsonify({"error": f"At most {MAX_METADATA_IDS} imdb_ids per request"}),
+            400,
+        )
+    movies, unavailable = app.config["METADATA"].get_many(imdb_ids)
+    return (
+        jsonify(
+            {
+                "movies": {
+                    imdb_id: summarize(metadata) for imdb_id, metadata in movies.items()
+                },
+                "unavailable": unavailable,
+            }
+        ),
+        200,
+    )
+
+
 @app.route("/movieDiscussion/<id>", methods=["GET"])
 def getMovieDisccusion(id):
     """
-    Returns the discussion store for the corresponding imdbId
+    Returns a page of the discussion for the corresponding imdbId; the
+    next_cursor of a page is passed as before to get the older comments
     """
-    return get_discussion(g.db, id)
+    try:
+        limit = int(request.args.get("limit", DISCUSSION_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_DISCUSSION_PAGE:
+        return jsonify({"error": "Invalid limit"}), 400
+    try:
+        return get_discussion(get_db(), id, limit, request.args.get("before"))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
 
 
 @app.route("/movieDiscussion/<id>", methods=["POST"])
@@ -591,33 +967,100 @@ def postCommentOnMovieDisccusion(id):
     """
     data = request.get_json()
     data["imdb_id"] = id
-    return create_or_update_discussion(g.db, data)
+    return create_or_update_discussion(get_db(), data)
+
+
+def get_db():
+    """
+    Checks a pooled db connection out for the current request, once.
+    """
+    if "db" not in g:
+        # remember the pool, a settings reload may replace it mid-request
+        g.db_pool = app.config["DB_POOL"]
+        g.db = g.db_pool.checkout()
+    return g.db
 
 
-@app.before_request
-def before_request():
+@app.teardown_appcontext
+def release_db(exception):  # pylint: disable=unused-argument
     """
-    Opens the db connection.
+    Returns the request's db connection, if it took one, to the pool.
     """
-    load_dotenv()
-    g.db = mysql.connector.connect(
-        user=os.getenv("DB_USER", "root"),
-        password=os.getenv("DB_PASSWORD", "root"),
-        # mysql is the name of the service in the github action config, so add it as default here for testing only
-        host=os.getenv("DB_HOST", "127.0.0.1"),
-        port=os.getenv("DB_PORT", 3306),
-        database=os.getenv("DB_NAME"),
+    db = g.pop("db", None)
+    if db is not None:
+        g.pop("db_pool").release(db)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Reports connection pool usage, cache, search index and catalog statistics.
+    """
+    return (
+        jsonify(
+            {
+                "db_pool": app.config["DB_POOL"].stats(),
+                "omdb_cache": app.config["METADATA"].stats(),
+                "http": app.config["HTTP_CLIENT"].stats(),
+                "search": search_service.stats(),
+                "catalog": catalog_status(),
+                "wall_cache": wall_cache.stats(),
+            }
+        ),
+        200,
     )
 
 
-@app.after_request
-def after_request(response):
+@app.route("/live", methods=["GET"])
+def live():
+    """
+    Liveness probe: the process is up and answering requests.
+    """
+    return jsonify({"status": "alive"}), 200
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness probe: 200 once warm_up() built every component, 503 before
+    that or when a step failed. Lists each component and its build time.
+    """
+    components = dict(readiness)
+    is_ready = len(components) == len(WARM_UP_STEPS) and all(
+        component["ready"] for component in components.values()
+    )
+    body = {"ready": is_ready, "components": components}
+    return jsonify(body), 200 if is_ready else 503
+
+
+@app.route("/settings/reload", methods=["POST"])
+def settings_reload():
+    """
+    Reloads the configuration. Only accepted from the local machine.
+    """
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Forbidden"}), 403
+    reload_settings()
+    return jsonify({"message": "Settings reloaded"}), 200
+
+
+@app.route("/catalog/reload", methods=["POST"])
+def catalog_reload():
     """
-    Closes the db connection.
+    Rebuilds the catalog and its indexes in the background, e.g. after new
+    rating deltas were merged. Only accepted from the local machine.
     """
-    g.db.close()
-    return response
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Forbidden"}), 403
+    started = reload_in_background()
+    return jsonify({"started": started, **catalog_status()}), 202
 
 
 if __name__ == "__main__":
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, reload_settings)
+    if current_settings().catalog_watch_interval > 0:
+        CatalogWatcher(current_settings().catalog_watch_interval).start()
+    # Built before app.run, so the first requests do not pay for it
+    warm_up()
     app.run(host="0.0.0.0", port=5000, debug=True)
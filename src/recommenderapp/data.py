@@ -1,58 +1,314 @@
-import pandas as pd
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Resumable pipeline filling in the IMDb ratings of movies.csv. Fetched
+ratings are appended to a checkpoint file as they arrive, so an interrupted
+run picks up where it stopped, and are merged into the CSV at the end.
+
+    python -m src.recommenderapp.data --workers 4 --rate 5
+
+With --incremental the CSV is left alone: only ratings that are missing or
+older than --max-age days are fetched, into a delta file that is merged into
+the catalog artifact, which running servers pick up without a restart.
+
+    python -m src.recommenderapp.data --incremental --max-age 30
+"""
+
+import argparse
+import json
 import os
-from imdb import IMDb
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.prediction_scripts.catalog import (
+    CATALOG_DIR,
+    MOVIES_CSV,
+    merge_deltas,
+    new_delta_path,
+    project_dir,
+    read_catalog,
+)
 
-# Initialize IMDb instance globally to reduce overhead
-ia = IMDb()
-i = 0
+CHECKPOINT = os.path.join(project_dir, "data", "ratings_checkpoint.jsonl")
+RATING_COLUMN = "imdb_ratings"
+# Stored when IMDb has no rating for a movie; "Error" marks failed lookups
+NO_RATING = "No Rating Found"
 
 
-def get_imdb_rating(imdb_id):
-    global i
-    i += 1
-    print(i)
-    if i % 10 == 0:
-        os.system("cls" if os.name == "nt" else "clear")
+def imdbpy_fetcher():
+    """
+    Returns a fetcher asking IMDb through IMDbPY.
+    """
+    from imdb import IMDb  # pylint: disable=import-outside-toplevel
 
-    try:
+    ia = IMDb()
+
+    def fetch(imdb_id):
         movie = ia.get_movie(imdb_id[2:])  # Removing 'tt' prefix
-        rating = movie.get("rating", "No Rating Found")
-        return rating
-    except Exception as e:
-        print(f"Error fetching data for IMDb ID {imdb_id}: {e}")
-        return "Error", "Error"
+        return movie.get("rating")
+
+    return fetch
+
+
+def fixture_fetcher(path):
+    """
+    Returns a fetcher answering from a JSON file mapping imdb_id to rating,
+    for running the pipeline offline.
+    """
+    with open(path, encoding="utf-8") as file:
+        ratings = json.load(file)
+    return ratings.get
+
+
+class RateLimiter:
+    """
+    Spaces calls so that at most rate of them start per second, across threads
+    """
 
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
 
-def update_csv_with_rating(file_path):
-    # Load the CSV file
-    df = pd.read_csv(file_path)
+    def wait(self):
+        """
+        Blocks until the caller may start its call.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
 
+
+def read_checkpoint(path):
+    """
+    Returns {imdb_id: rating} of the records in a checkpoint file. A line
+    cut short by a crash is ignored.
+    """
+    ratings = {}
+    if not os.path.exists(path):
+        return ratings
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            ratings[record["imdb_id"]] = record["rating"]
+    return ratings
+
+
+def ids_to_fetch(df, done):
+    """
+    Returns the imdb ids whose rating is missing or a failed lookup and not
+    in the done checkpoint, without duplicates.
+    """
+    ratings = df[RATING_COLUMN] if RATING_COLUMN in df.columns else None
+    missing = (
+        df.index
+        if ratings is None
+        else df.index[ratings.isna() | (ratings.astype(str) == "Error")]
+    )
+    ids = df.loc[missing, "imdb_id"].dropna().astype(str)
+    return [imdb_id for imdb_id in dict.fromkeys(ids) if imdb_id not in done]
+
+
+def stale_ids(catalog, max_age, now=None):
+    """
+    Returns the imdb ids of the catalog whose rating was never fetched or
+    was fetched more than max_age seconds ago, without duplicates.
+    """
+    now = time.time() if now is None else now
+    fetched_at = np.asarray(catalog.rating_fetched_at)
+    # NaN compares False, so never fetched ratings are due as well
+    due = ~(fetched_at >= now - max_age)
+    ids = catalog.imdb_ids[due]
+    return [imdb_id for imdb_id in dict.fromkeys(ids) if imdb_id]
+
+
+def fetch_ratings(ids, fetcher, checkpoint, workers=4, rate=5.0, checkpoint_every=50):
+    """
+    Fetches the rating of every id and appends it to the checkpoint file,
+    which is flushed to disk every checkpoint_every records. Failed lookups
+    are not recorded, so the next run retries them.
+    Returns the number of records written and of failures.
+    """
+    limiter = RateLimiter(rate)
+
+    def fetch(imdb_id):
+        limiter.wait()
+        rating = fetcher(imdb_id)
+        return NO_RATING if rating is None else rating
+
+    written = failed = 0
+    # a record cut short by a crash must not swallow the first new one
+    if os.path.exists(checkpoint) and os.path.getsize(checkpoint):
+        with open(checkpoint, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read() != b"\n":
+                with open(checkpoint, "a", encoding="utf-8") as out:
+                    out.write("\n")
+    with open(checkpoint, "a", encoding="utf-8") as out, ThreadPoolExecutor(
+        workers
+    ) as pool:
+        futures = {pool.submit(fetch, imdb_id): imdb_id for imdb_id in ids}
+        for future in as_completed(futures):
+            imdb_id = futures[future]
+            try:
+                rating = future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                failed += 1
+                print(f"Error fetching data for IMDb ID {imdb_id}: {e}")
+                continue
+            record = {"imdb_id": imdb_id, "rating": rating, "fetched_at": time.time()}
+            out.write(json.dumps(record) + "\n")
+            written += 1
+            if written % checkpoint_every == 0:
+                out.flush()
+                os.fsync(out.fileno())
+                print(f"{written}/{len(ids)} ratings fetched")
+    return written, failed
+
+
+def apply_checkpoint(csv_path, checkpoint):
+    """
+    Writes the checkpointed ratings into the CSV, replacing it atomically.
+    Returns the number of rows updated.
+    """
+    ratings = read_checkpoint(checkpoint)
+    df = pd.read_csv(csv_path)
+    if RATING_COLUMN not in df.columns:
+        df[RATING_COLUMN] = None
+    df[RATING_COLUMN] = df[RATING_COLUMN].astype(object)
+    rows = df["imdb_id"].isin(ratings.keys())
+    df.loc[rows, RATING_COLUMN] = df.loc[rows, "imdb_id"].map(ratings)
+    tmp_path = csv_path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, csv_path)
+    return int(rows.sum())
+
+
+def update_csv_with_rating(
+    csv_path=MOVIES_CSV,
+    checkpoint=CHECKPOINT,
+    fetcher=None,
+    workers=4,
+    rate=5.0,
+    checkpoint_every=50,
+):
+    """
+    Fetches the missing ratings of csv_path, resuming from checkpoint, and
+    merges them into the CSV.
+    """
+    if fetcher is None:
+        fetcher = imdbpy_fetcher()
+    df = pd.read_csv(csv_path)
     # Ensure 'imdb_id' column exists
     if "imdb_id" not in df.columns:
         print("Error: 'imdb_id' column not found in the CSV file.")
         return
+    ids = ids_to_fetch(df, read_checkpoint(checkpoint))
+    written, failed = fetch_ratings(
+        ids, fetcher, checkpoint, workers, rate, checkpoint_every
+    )
+    updated = apply_checkpoint(csv_path, checkpoint)
+    print(
+        f"Fetched {written} ratings ({failed} failed, retried on the next run); "
+        f"updated {updated} rows of '{csv_path}'."
+    )
 
-    df = df.drop_duplicates(subset="title", keep="first")
-
-    # Check if 'rating' column exist; if not, add it
-    if "rating" not in df.columns:
-        df["rating"] = None
 
-    # Filter rows where rating or awards are still missing
-    imdb_ids_to_fetch = df[df["rating"].isnull()]["imdb_id"].tolist()
+def update_catalog_ratings(
+    csv_path=MOVIES_CSV,
+    catalog_dir=CATALOG_DIR,
+    fetcher=None,
+    max_age=None,
+    workers=4,
+    rate=5.0,
+    checkpoint_every=50,
+):
+    """
+    Fetches the missing and stale ratings of the catalog into a new delta
+    file and merges it into the catalog artifact. movies.csv is not written.
+    Returns the new artifact build, or None when no rating was due.
+    :param max_age: seconds after which a rating is fetched again, None to
+        only fetch missing ratings
+    """
+    if fetcher is None:
+        fetcher = imdbpy_fetcher()
+    # deltas of an interrupted run count as fetched
+    merge_deltas(csv_path, catalog_dir)
+    catalog = read_catalog(csv_path, catalog_dir)
+    ids = stale_ids(catalog, float("inf") if max_age is None else max_age)
+    if not ids:
+        print("Every rating is up to date.")
+        return None
+    written, failed = fetch_ratings(
+        ids, fetcher, new_delta_path(catalog_dir), workers, rate, checkpoint_every
+    )
+    path = merge_deltas(csv_path, catalog_dir)
+    print(
+        f"Fetched {written} ratings ({failed} failed, retried on the next run); "
+        f"catalog artifact written to {path}."
+    )
+    return path
 
-    # Fetch rating and awards details concurrently for missing entries
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        results = list(executor.map(get_imdb_rating, imdb_ids_to_fetch))
 
-    df.loc[df["rating"].isnull(), "rating"] = results
-
-    # Save the updated DataFrame back to the CSV
-    df.to_csv(file_path, index=False)
-    print(f"Updated CSV saved with IMDb ratings in '{file_path}'.")
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fill in the missing IMDb ratings of movies.csv"
+    )
+    parser.add_argument("--csv", default=MOVIES_CSV)
+    parser.add_argument("--checkpoint", default=CHECKPOINT)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=5.0, help="lookups per second")
+    parser.add_argument("--checkpoint-every", type=int, default=50)
+    parser.add_argument(
+        "--fixture", help="JSON file of imdb_id to rating used instead of IMDb"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="write a rating delta into the catalog artifact instead of the CSV",
+    )
+    parser.add_argument("--catalog", default=CATALOG_DIR, help="artifact directory")
+    parser.add_argument(
+        "--max-age", type=float, help="days after which a rating is fetched again"
+    )
+    args = parser.parse_args(argv)
+    fetcher = fixture_fetcher(args.fixture) if args.fixture else None
+    if args.incremental:
+        update_catalog_ratings(
+            args.csv,
+            args.catalog,
+            fetcher,
+            None if args.max_age is None else args.max_age * 24 * 3600,
+            args.workers,
+            args.rate,
+            args.checkpoint_every,
+        )
+        return
+    update_csv_with_rating(
+        args.csv,
+        args.checkpoint,
+        fetcher,
+        args.workers,
+        args.rate,
+        args.checkpoint_every,
+    )
 
 
-# Usage example
-csv_file_path = r".\data\movies.csv"  # Replace with your file path
-update_csv_with_rating(csv_file_path)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Process-wide MySQL connection pool. Connections are opened once and handed
+out to requests, instead of connecting for every request.
+"""
+
+import threading
+import time
+
+from mysql.connector import errors, pooling
+
+# Connections kept open by the pool (mysql.connector allows at most 32)
+POOL_SIZE = 5
+# Seconds a request waits for a free connection before failing
+POOL_TIMEOUT = 10.0
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections, opened on the first checkout. Callers
+    block for up to timeout seconds when every connection is in use.
+    """
+
+    def __init__(self, settings, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        """
+        :param settings: mysql.connector connection arguments
+        :param size: number of pooled connections
+        :param timeout: seconds to wait for a free connection
+        """
+        self.size = size
+        self.timeout = timeout
+        self.settings = settings
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.closed = False
+        self._slots = threading.BoundedSemaphore(size)
+        self._stats_lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name="popcornpicks", pool_size=self.size, **self.settings
+                )
+            return self._pool
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Builds the pool described by a Settings object.
+        """
+        return cls(
+            settings.db_connection(),
+            size=settings.db_pool_size,
+            timeout=settings.db_pool_timeout,
+        )
+
+    def checkout(self):
+        """
+        Returns a pooled connection. Hand it back with release.
+        """
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self.timeouts += 1
+            raise errors.PoolError(
+                f"No database connection became free within {self.timeout} seconds"
+            )
+        waited = time.perf_counter() - started
+        try:
+            connection = self._get_pool().get_connection()
+        except Exception:
+            self._slots.release()
+            raise
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.checkout_seconds += elapsed
+            self.max_checkout_seconds = max(self.max_checkout_seconds, elapsed)
+        return connection
+
+    def release(self, connection):
+        """
+        Returns a connection obtained from checkout to the pool.
+        """
+        try:
+            connection.close()
+            if self.closed:
+                self._disconnect_idle()
+        finally:
+            with self._stats_lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def _disconnect_idle(self):
+        with self._pool_lock:
+            pool = self._pool
+        if pool is not None:
+            pool._remove_connections()  # pylint: disable=protected-access
+
+    def close(self):
+        """
+        Disconnects the idle connections. The ones still checked out are
+        disconnected when they are released.
+        """
+        self.closed = True
+        self._disconnect_idle()
+
+    def stats(self):
+        """
+        Returns the pool size, current usage, and wait and checkout latencies.
+        """
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_seconds": self.wait_seconds / checkouts if checkouts else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+                "avg_checkout_seconds": (
+                    self.checkout_seconds / checkouts if checkouts else 0.0
+                ),
+                "max_checkout_seconds": self.max_checkout_seconds,
+            }
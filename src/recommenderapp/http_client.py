@@ -0,0 +1,158 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Shared client for outbound HTTP calls to external metadata APIs: one pooled
+requests.Session with timeouts, bounded concurrency, retries with backoff
+and per-host latency histograms.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Responses worth retrying, the server may answer differently next time
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class LatencyHistogram:
+    """
+    Counts of request latencies per LATENCY_BUCKETS bucket, plus an overflow
+    bucket, for one host
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.errors = 0
+        self.retries = 0
+
+    def observe(self, seconds):
+        """
+        Records one request that took seconds.
+        """
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+
+    def snapshot(self):
+        """
+        Returns the histogram as a dict keyed by bucket upper bound.
+        """
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        return {
+            "buckets": dict(zip(bounds, self.buckets)),
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "errors": self.errors,
+            "retries": self.retries,
+        }
+
+
+class HttpClient:
+    """
+    Thread-safe outbound HTTP client. At most max_concurrency requests are in
+    flight at once; connection errors, timeouts and RETRY_STATUSES answers
+    are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        connect_timeout=3.05,
+        read_timeout=10.0,
+        max_concurrency=16,
+        retries=2,
+        backoff=0.2,
+    ):
+        """
+        :param connect_timeout: seconds to establish a connection
+        :param read_timeout: seconds to wait for the response
+        :param max_concurrency: requests allowed in flight, also the pool size
+        :param retries: extra attempts after a failed one
+        :param backoff: seconds before the first retry, doubled for each next one
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self._histograms = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Builds the client described by a Settings object.
+        """
+        return cls(
+            connect_timeout=settings.http_connect_timeout,
+            read_timeout=settings.http_read_timeout,
+            max_concurrency=settings.http_max_concurrency,
+            retries=settings.http_retries,
+            backoff=settings.http_backoff,
+        )
+
+    def _record(self, host, seconds=None, retried=False):
+        with self._stats_lock:
+            histogram = self._histograms.setdefault(host, LatencyHistogram())
+            if seconds is None:
+                histogram.errors += 1
+            else:
+                histogram.observe(seconds)
+            if retried:
+                histogram.retries += 1
+
+    def get(self, url, params=None):
+        """
+        Sends a GET request and returns the response. When every attempt
+        failed, the last connection error or timeout propagates, or the last
+        retryable response is returned as is.
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            last = attempt == self.retries
+            try:
+                with self._slots:
+                    # the latency excludes time spent waiting for a slot
+                    started = time.perf_counter()
+                    response = self.session.get(
+                        url, params=params, timeout=self.timeout
+                    )
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(host, retried=not last)
+                if last:
+                    raise
+            else:
+                retry = not last and response.status_code in RETRY_STATUSES
+                self._record(host, time.perf_counter() - started, retried=retry)
+                if not retry:
+                    return response
+            time.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+    def stats(self):
+        """
+        Returns the latency histogram of every host called so far.
+        """
+        with self._stats_lock:
+            return {host: h.snapshot() for host, h in self._histograms.items()}
+
+    def close(self):
+        """
+        Closes the pooled connections.
+        """
+        self.session.close()
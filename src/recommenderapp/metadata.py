@@ -0,0 +1,306 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Server-side cache of OMDB movie metadata: an in-memory LRU in front of a
+SQLite file, so a movie is fetched from OMDB at most once per TTL.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.prediction_scripts.cache import LRUCache
+from src.recommenderapp.http_client import HttpClient
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(os.path.dirname(app_dir))
+
+OMDB_URL = "http://www.omdbapi.com/"
+METADATA_DB = os.path.join(project_dir, "data", "omdb_cache.sqlite3")
+# Errors OMDB answers for movies it does not know, cached for negative_ttl;
+# any other Error, like "Something went wrong.", is transient
+NOT_FOUND_ERRORS = frozenset(("Incorrect IMDb ID.", "Movie not found!"))
+# OMDB fields returned by the batch endpoint, the ones the pages render
+SUMMARY_FIELDS = (
+    "imdbID",
+    "Title",
+    "Year",
+    "Rated",
+    "Runtime",
+    "Genre",
+    "Director",
+    "Plot",
+    "Poster",
+    "imdbRating",
+)
+
+
+def summarize(metadata):
+    """
+    Keeps the SUMMARY_FIELDS of an OMDB response, None stays None.
+    """
+    if metadata is None:
+        return None
+    return {field: metadata.get(field) for field in SUMMARY_FIELDS}
+
+
+class MetadataUnavailable(Exception):
+    """
+    OMDB refused the request, e.g. a bad API key or an exhausted quota
+    """
+
+
+class MetadataStore:
+    """
+    SQLite table of OMDB responses keyed by imdb_id. A NULL body records
+    that OMDB does not know the movie. The file is created on first use.
+    """
+
+    def __init__(self, path=METADATA_DB):
+        self.path = path
+        self.closed = False
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        """
+        Returns the database, opened on first use, or None once closed.
+        Callers hold _lock.
+        """
+        if self._db is None and not self.closed:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS omdb_metadata ("
+                    "imdb_id TEXT PRIMARY KEY, body TEXT, fetched_at REAL NOT NULL)"
+                )
+        return None if self.closed else self._db
+
+    def get(self, imdb_id):
+        """
+        Returns (metadata or None, fetched_at), or None when nothing is stored.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT body, fetched_at FROM omdb_metadata WHERE imdb_id = ?",
+                (imdb_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        body, fetched_at = row
+        return (None if body is None else json.loads(body)), fetched_at
+
+    def put(self, imdb_id, metadata, fetched_at):
+        """
+        Stores the metadata of imdb_id, None when the movie was not found.
+        """
+        body = None if metadata is None else json.dumps(metadata)
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO omdb_metadata VALUES (?, ?, ?)",
+                    (imdb_id, body, fetched_at),
+                )
+
+    def recent(self, limit):
+        """
+        Returns up to limit (imdb_id, metadata or None, fetched_at) entries,
+        most recently fetched first.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return []
+            rows = db.execute(
+                "SELECT imdb_id, body, fetched_at FROM omdb_metadata "
+                "ORDER BY fetched_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            (imdb_id, None if body is None else json.loads(body), fetched_at)
+            for imdb_id, body, fetched_at in rows
+        ]
+
+    def close(self):
+        """
+        Closes the database file. Requests still holding the store read it as
+        empty and stop writing to it.
+        """
+        with self._lock:
+            self.closed = True
+            if self._db is not None:
+                self._db.close()
+
+
+class MetadataCache:
+    """
+    Read-through OMDB cache. Found movies stay fresh for ttl seconds, movies
+    OMDB does not know for negative_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        url=OMDB_URL,
+        store=None,
+        maxsize=1024,
+        ttl=7 * 24 * 3600,
+        negative_ttl=3600,
+        client=None,
+        workers=8,
+    ):
+        """
+        :param api_key: OMDB API key
+        :param url: OMDB endpoint, a local stub server in tests
+        :param store: MetadataStore behind the in-memory cache
+        :param maxsize: entries kept in memory
+        :param ttl: seconds a found movie is served from the cache
+        :param negative_ttl: seconds a "Movie not found" answer is cached
+        :param client: HttpClient used to call OMDB
+        :param workers: concurrent OMDB requests when filling a batch
+        """
+        self.api_key = api_key
+        self.url = url
+        self.store = store if store is not None else MetadataStore()
+        self.memory = LRUCache(maxsize)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.client = client if client is not None else HttpClient()
+        self.workers = workers
+        self.fetches = 0
+        self._fetches_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings, client=None):
+        """
+        Builds the cache described by a Settings object.
+        """
+        return cls(
+            settings.omdb_api_key,
+            url=settings.omdb_url,
+            store=MetadataStore(settings.omdb_cache_path),
+            maxsize=settings.omdb_cache_size,
+            ttl=settings.omdb_cache_ttl,
+            negative_ttl=settings.omdb_negative_ttl,
+            client=client,
+            workers=settings.omdb_fetch_workers,
+        )
+
+    def is_fresh(self, metadata, fetched_at):
+        """
+        Tells whether an entry fetched at fetched_at can still be served.
+        """
+        ttl = self.negative_ttl if metadata is None else self.ttl
+        return time.time() - fetched_at < ttl
+
+    def fetch(self, imdb_id):
+        """
+        Asks OMDB for imdb_id. Returns the metadata, or None if not found.
+        OMDB answers unknown ids with status 200 and one of NOT_FOUND_ERRORS;
+        any other failure raises instead of being cached.
+        """
+        with self._fetches_lock:
+            self.fetches += 1
+        response = self.client.get(
+            self.url, params={"i": imdb_id, "apikey": self.api_key}
+        )
+        if not response.ok:
+            raise MetadataUnavailable(f"OMDB answered {response.status_code}")
+        data = response.json()
+        error = data.get("Error")
+        if error is None:
+            return data
+        if error in NOT_FOUND_ERRORS:
+            return None
+        raise MetadataUnavailable(error)
+
+    def cached(self, imdb_id):
+        """
+        Returns the fresh (metadata, fetched_at) entry of imdb_id from memory
+        or the store, or None when it has to be fetched.
+        """
+        entry = self.memory.get(imdb_id)
+        if entry is not None and self.is_fresh(*entry):
+            return entry
+        entry = self.store.get(imdb_id)
+        if entry is not None and self.is_fresh(*entry):
+            self.memory.put(imdb_id, entry)
+            return entry
+        return None
+
+    def get(self, imdb_id):
+        """
+        Returns the OMDB metadata of imdb_id, or None if OMDB does not know
+        it. Network errors and MetadataUnavailable propagate and are not
+        cached.
+        """
+        entry = self.cached(imdb_id)
+        if entry is None:
+            entry = (self.fetch(imdb_id), time.time())
+            self.store.put(imdb_id, *entry)
+            self.memory.put(imdb_id, entry)
+        return entry[0]
+
+    def warm(self):
+        """
+        Loads the most recently fetched fresh entries of the store into
+        memory, up to its size. Returns the number of entries loaded.
+        """
+        loaded = 0
+        # oldest first, so the newest entries end up most recently used
+        for imdb_id, metadata, fetched_at in reversed(
+            self.store.recent(self.memory.maxsize)
+        ):
+            if self.is_fresh(metadata, fetched_at):
+                self.memory.put(imdb_id, (metadata, fetched_at))
+                loaded += 1
+        return loaded
+
+    def get_many(self, imdb_ids):
+        """
+        Looks up several movies, fetching the misses from OMDB concurrently.
+        Returns a dict of imdb_id to metadata (None when not found) and the
+        list of ids OMDB could not be asked about.
+        """
+        movies = {}
+        misses = []
+        for imdb_id in dict.fromkeys(imdb_ids):
+            entry = self.cached(imdb_id)
+            if entry is None:
+                misses.append(imdb_id)
+            else:
+                movies[imdb_id] = entry[0]
+        unavailable = []
+        if misses:
+            with ThreadPoolExecutor(min(self.workers, len(misses))) as pool:
+                futures = [
+                    (imdb_id, pool.submit(self.get, imdb_id)) for imdb_id in misses
+                ]
+            for imdb_id, future in futures:
+                try:
+                    movies[imdb_id] = future.result()
+                except (requests.RequestException, ValueError, MetadataUnavailable):
+                    unavailable.append(imdb_id)
+        return movies, unavailable
+
+    def stats(self):
+        """
+        Returns the in-memory cache counters and the number of OMDB fetches.
+        """
+        return {**self.memory.stats(), "fetches": self.fetches}
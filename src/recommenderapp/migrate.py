@@ -0,0 +1,254 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Brings an existing PopcornPicks database up to the current schema:
+
+    python -m src.recommenderapp.migrate
+
+Every migration runs once; the applied ones are recorded in the
+SchemaMigrations table. Migrations also run safely on databases created
+from db/init.sql, which already has the final schema.
+"""
+
+import datetime
+import json
+
+import mysql.connector
+
+from src.recommenderapp.settings import Settings
+
+CREATE_DISCUSSION_COMMENTS = """
+CREATE TABLE IF NOT EXISTS DiscussionComments (
+  idComment INT NOT NULL AUTO_INCREMENT,
+  imdb_id VARCHAR(45) NOT NULL,
+  user VARCHAR(45) NOT NULL,
+  comment TEXT NOT NULL,
+  created_at DATETIME(6) NOT NULL,
+  PRIMARY KEY (idComment),
+  INDEX imdb_id_created_at_idx (imdb_id ASC, created_at ASC)
+)
+"""
+
+# Legacy comments have no timestamp; they get one from before any new comment
+LEGACY_COMMENTS_TIME = datetime.datetime(1970, 1, 1)
+
+CREATE_WALL_FEED = """
+CREATE TABLE IF NOT EXISTS WallFeed (
+  idPost INT NOT NULL AUTO_INCREMENT,
+  rating_id INT NOT NULL,
+  name VARCHAR(256) NOT NULL,
+  imdb_id VARCHAR(45) NOT NULL,
+  username VARCHAR(45) NOT NULL,
+  score INT NOT NULL,
+  review TEXT NULL,
+  time DATETIME NOT NULL,
+  PRIMARY KEY (idPost),
+  UNIQUE INDEX rating_id_UNIQUE (rating_id),
+  CONSTRAINT fk_wall_rating_id
+    FOREIGN KEY (rating_id)
+    REFERENCES Ratings (idRatings)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION
+)
+"""
+# Copies the reviews missing from WallFeed, oldest first so that the post
+# ids follow the review times
+FILL_WALL_FEED = """
+INSERT INTO WallFeed (rating_id, name, imdb_id, username, score, review, time)
+SELECT r.idRatings, m.name, m.imdb_id, u.username, r.score, r.review, r.time
+FROM Ratings r
+JOIN Movies m ON m.idMovies = r.movie_id
+JOIN Users u ON u.idUsers = r.user_id
+LEFT JOIN WallFeed f ON f.rating_id = r.idRatings
+WHERE f.idPost IS NULL
+ORDER BY r.time, r.idRatings
+"""
+
+# (table, index name, definition) of the indexes behind the list endpoints
+LIST_INDEXES = (
+    (
+        "Watchlist",
+        "user_movie_UNIQUE",
+        "UNIQUE INDEX user_movie_UNIQUE (user_id, movie_id)",
+    ),
+    (
+        "Watchlist",
+        "user_time_idx",
+        "INDEX user_time_idx (user_id ASC, time DESC, movie_id)",
+    ),
+    (
+        "WatchedHistory",
+        "user_movie_UNIQUE",
+        "UNIQUE INDEX user_movie_UNIQUE (user_id, movie_id)",
+    ),
+    (
+        "WatchedHistory",
+        "user_watched_date_idx",
+        "INDEX user_watched_date_idx (user_id ASC, watched_date DESC, movie_id)",
+    ),
+    (
+        "Friends",
+        "user_friend_UNIQUE",
+        "UNIQUE INDEX user_friend_UNIQUE (idUsers, idFriend)",
+    ),
+)
+# Deletes the rows a unique index would reject, keeping the oldest one
+DUPLICATES = {
+    "Watchlist": "DELETE a FROM Watchlist a JOIN Watchlist b "
+    "ON a.user_id = b.user_id AND a.movie_id = b.movie_id "
+    "AND a.idWatchlist > b.idWatchlist",
+    "WatchedHistory": "DELETE a FROM WatchedHistory a JOIN WatchedHistory b "
+    "ON a.user_id = b.user_id AND a.movie_id = b.movie_id "
+    "AND a.idWatchedHistory > b.idWatchedHistory",
+    "Friends": "DELETE a FROM Friends a JOIN Friends b "
+    "ON a.idUsers = b.idUsers AND a.idFriend = b.idFriend "
+    "AND a.idFriendship > b.idFriendship",
+}
+
+
+def table_exists(cursor, table):
+    """
+    Tells whether the current database has the table.
+    """
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def index_exists(cursor, table, index):
+    """
+    Tells whether the table of the current database has the index.
+    """
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, index),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def split_discussions(db):
+    """
+    Moves the comments of the legacy Discussion JSON blobs into
+    DiscussionComments, one row per comment in their original order.
+    Each movie is moved and its blob deleted in one transaction, so an
+    interrupted run resumes with the movies left.
+    Returns the number of comments moved.
+    """
+    cursor = db.cursor()
+    cursor.execute(CREATE_DISCUSSION_COMMENTS)
+    if not table_exists(cursor, "Discussion"):
+        return 0
+    cursor.execute("SELECT id, imdb_id, comments FROM Discussion ORDER BY id")
+    discussions = cursor.fetchall()
+    moved = 0
+    for discussion_id, imdb_id, comments in discussions:
+        # stamped before any new comment, in blob order, the same on a resumed run
+        created_at = LEGACY_COMMENTS_TIME + datetime.timedelta(seconds=discussion_id)
+        rows = [
+            (
+                imdb_id,
+                comment["user"],
+                comment["comment"],
+                created_at + datetime.timedelta(microseconds=position),
+            )
+            for position, comment in enumerate(json.loads(comments or "[]"))
+        ]
+        if rows:
+            cursor.executemany(
+                "INSERT INTO DiscussionComments (imdb_id, user, comment, created_at) "
+                "VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+        cursor.execute("DELETE FROM Discussion WHERE id = %s", (discussion_id,))
+        db.commit()
+        moved += len(rows)
+    return moved
+
+
+def add_list_indexes(db):
+    """
+    Adds the LIST_INDEXES that are missing. Duplicate rows are removed
+    before a unique index is added to their table.
+    Returns the number of indexes added.
+    """
+    cursor = db.cursor()
+    added = 0
+    for table, name, definition in LIST_INDEXES:
+        if index_exists(cursor, table, name):
+            continue
+        if definition.startswith("UNIQUE"):
+            cursor.execute(DUPLICATES[table])
+            db.commit()
+        cursor.execute(f"ALTER TABLE {table} ADD {definition}")
+        added += 1
+    return added
+
+
+def fill_wall_feed(db):
+    """
+    Creates WallFeed and copies the existing reviews into it.
+    Returns the number of posts added.
+    """
+    cursor = db.cursor()
+    cursor.execute(CREATE_WALL_FEED)
+    cursor.execute(FILL_WALL_FEED)
+    db.commit()
+    return cursor.rowcount
+
+
+# Every migration in the order it is applied, named for SchemaMigrations
+MIGRATIONS = (
+    ("0001_discussion_comments", split_discussions),
+    ("0002_list_indexes", add_list_indexes),
+    ("0003_wall_feed", fill_wall_feed),
+)
+
+
+def migrate(db):
+    """
+    Applies the MIGRATIONS not recorded in SchemaMigrations yet, in order.
+    Returns the names of the migrations applied.
+    """
+    cursor = db.cursor()
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS SchemaMigrations ("
+        "name VARCHAR(100) NOT NULL, applied_at DATETIME NOT NULL, "
+        "PRIMARY KEY (name))"
+    )
+    cursor.execute("SELECT name FROM SchemaMigrations")
+    done = {name for (name,) in cursor.fetchall()}
+    applied = []
+    for name, migration in MIGRATIONS:
+        if name in done:
+            continue
+        migration(db)
+        cursor.execute(
+            "INSERT INTO SchemaMigrations (name, applied_at) VALUES (%s, %s)",
+            (name, datetime.datetime.utcnow()),
+        )
+        db.commit()
+        applied.append(name)
+    return applied
+
+
+def main():
+    """
+    Command line entry point, migrates the database of the .env settings.
+    """
+    db = mysql.connector.connect(**Settings.from_env().db_connection())
+    try:
+        applied = migrate(db)
+        print(f"Applied {len(applied)} migrations: {', '.join(applied) or 'none'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
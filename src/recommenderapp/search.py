@@ -4,15 +4,175 @@ This code is licensed under MIT license (see LICENSE for details)
 
 @author: PopcornPicks
 """
-import os
-import pandas as pd
+from array import array
+from bisect import bisect_right
+from itertools import islice
+import sys
+import time
+
+import numpy as np
+
+from src.prediction_scripts.catalog import get_catalog, register_index
 
 # from flask import jsonify, request, render_template
 
+# Number of suggestions returned to the autocomplete box
+SUGGESTIONS = 10
+
+# Catalog columns searched by each dropdown filter
+FILTER_KEYS = {
+    "genreBased": "genres",
+    "dirBased": "director",
+    "actorBased": "actors",
+    "titleBased": "title",
+}
+
+
+class TextColumn:
+    """
+    Lower-cased copy of a catalog column kept as one string, so a substring
+    query is a few str.find calls instead of a Python loop over every row
+    """
+
+    SEPARATOR = "\x00"
+
+    def __init__(self, values):
+        lowered = [value.lower() for value in values]
+        self.size = len(lowered)
+        self.text = self.SEPARATOR.join(lowered) + self.SEPARATOR
+        # starts[row] is the offset of row in text, starts[-1] == len(text)
+        self.starts = array("q", [0])
+        for value in lowered:
+            self.starts.append(self.starts[-1] + len(value) + 1)
+
+    def nbytes(self):
+        """
+        Returns the approximate memory held by the column.
+        """
+        return sys.getsizeof(self.text) + sys.getsizeof(self.starts)
+
+    def value(self, row):
+        """
+        Returns the lower-cased value of row.
+        """
+        return self.text[self.starts[row] : self.starts[row + 1] - 1]
+
+    def rows_containing(self, word):
+        """
+        Yields, in row order, the rows whose value contains the lower-cased word.
+        """
+        if self.SEPARATOR in word:
+            return
+        pos = self.text.find(word)
+        while pos != -1:
+            row = bisect_right(self.starts, pos) - 1
+            if row >= self.size:
+                return
+            yield row
+            pos = self.text.find(word, self.starts[row + 1])
+
 
-app_dir = os.path.dirname(os.path.abspath(__file__))
-code_dir = os.path.dirname(app_dir)
-project_dir = os.path.dirname(code_dir)
+class TrigramIndex:
+    """
+    Inverted index from every three-character substring of a TextColumn to
+    the sorted rows containing it
+    """
+
+    N = 3
+
+    def __init__(self, column):
+        self.column = column
+        postings = {}
+        for row in range(column.size):
+            value = column.value(row)
+            for gram in {value[i : i + self.N] for i in range(len(value) - 2)}:
+                postings.setdefault(gram, []).append(row)
+        self.postings = {}
+        for gram, rows in postings.items():
+            rows = np.array(rows, dtype=np.int32)
+            rows.flags.writeable = False
+            self.postings[gram] = rows
+
+    def nbytes(self):
+        """
+        Returns the approximate memory held by the posting lists.
+        """
+        return sys.getsizeof(self.postings) + sum(
+            sys.getsizeof(gram) + rows.nbytes for gram, rows in self.postings.items()
+        )
+
+    def rows_containing(self, word):
+        """
+        Yields, in row order, the rows whose value contains the lower-cased word.
+        Queries shorter than a trigram fall back to scanning the column.
+        """
+        if len(word) < self.N:
+            yield from self.column.rows_containing(word)
+            return
+        grams = {word[i : i + self.N] for i in range(len(word) - 2)}
+        if any(gram not in self.postings for gram in grams):
+            return
+        lists = sorted((self.postings[gram] for gram in grams), key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        # trigrams only bound the candidates, the full word must still match
+        for row in rows.tolist():
+            if word in self.column.value(row):
+                yield row
+
+
+class SearchIndex:
+    """
+    Lower-cased, concatenated text of the searchable catalog columns.
+    Never modified after construction, so threads share it without locking.
+    """
+
+    def __init__(self, catalog):
+        started = time.perf_counter()
+        self.catalog = catalog
+        self.titles = catalog.titles
+        self.columns = {
+            key: TextColumn(catalog.columns[key]) for key in FILTER_KEYS.values()
+        }
+        # genres are few and short, a plain scan already stops early
+        self.trigrams = {
+            key: TrigramIndex(self.columns[key])
+            for key in ("title", "director", "actors")
+        }
+        self.build_seconds = time.perf_counter() - started
+
+    def stats(self):
+        """
+        Returns the size, build time and approximate memory of the index.
+        """
+        return {
+            "catalog_version": self.catalog.version,
+            "rows": len(self.titles),
+            "build_seconds": self.build_seconds,
+            "memory_bytes": sum(column.nbytes() for column in self.columns.values())
+            + sum(index.nbytes() for index in self.trigrams.values()),
+        }
+
+    def lookup(self, key, word):
+        """
+        Yields the rows of column key containing word, through the trigram
+        index when the column has one.
+        """
+        if key in self.trigrams:
+            return self.trigrams[key].rows_containing(word)
+        return self.columns[key].rows_containing(word)
+
+
+register_index("search", SearchIndex)
+
+
+def get_search_index():
+    """
+    Returns the search index of the process-wide catalog, which is built
+    together with the catalog.
+    """
+    return get_catalog().index("search")
 
 
 class Search:
@@ -20,23 +180,67 @@ class Search:
     Search feature for landing page
     """
 
-    df = pd.read_csv(project_dir + "/data/movies.csv")
+    def __init__(self, index=None):
+        """
+        :param index: SearchIndex to query, the shared one when None
+        """
+        self._own_index = index
 
-    def __init__(self):
-        pass
+    @property
+    def index(self):
+        """
+        The SearchIndex queried by this Search
+        """
+        if self._own_index is not None:
+            return self._own_index
+        return get_search_index()
+
+    def stats(self):
+        """
+        Returns the statistics of the index in use.
+        """
+        return self.index.stats()
+
+    def iter_anywhere(self, word, visited_words):
+        """
+        Lazily yields titles containing word that are not in visited_words
+        """
+        word = word.lower()
+        index = self.index
+        titles = index.titles
+        for row in index.lookup("title", word):
+            if titles[row] not in visited_words:
+                yield titles[row]
+
+    def iter_search(self, word, filter):
+        """
+        Lazily yields titles whose filter column contains word
+        """
+        word = word.lower()
+        filter_key = FILTER_KEYS.get(filter, "title")
+        index = self.index
+        titles = index.titles
+        for row in index.lookup(filter_key, word):
+            yield titles[row]
+
+    def iter_results(self, word, filter):
+        """
+        Lazily yields the filtered matches, then the remaining title matches
+        """
+        # both passes read the same index even if the catalog reloads meanwhile
+        finder = Search(self.index)
+        visited_words = set()
+        for title in finder.iter_search(word, filter):
+            visited_words.add(title)
+            yield title
+        # the filtered pass is exhausted here, so visited_words is complete
+        yield from finder.iter_anywhere(word, visited_words)
 
     def anywhere(self, word, visited_words):
         """
         Function to check visited words
         """
-        res = []
-        word = word.lower()
-        for x in self.df["title"]:
-            if x not in visited_words:
-                curr = x.lower()
-                if word in curr:
-                    res.append(x)
-        return res
+        return list(self.iter_anywhere(word, visited_words))
 
     def search(self, word, filter):
         """
@@ -45,28 +249,7 @@ class Search:
         :param filter: the choice selected in the dropdown next to the textbox
         :return: title of film matching criteria
         """
-        # n = len(word)
-        res = []
-        word = word.lower()
-        filter_key = ""
-
-        if filter == "genreBased":
-            filter_key = "genres"
-        elif filter == "dirBased":
-            filter_key = "director"
-        elif filter == "actorBased":
-            filter_key = "actors"
-        elif filter == "titleBased":
-            filter_key = "title"
-        else:
-            filter_key = "title"
-
-        for index, row in self.df.iterrows():
-            curr = row[filter_key].lower()
-            if word in curr:
-                res.append(row["title"])
-
-        return res
+        return list(self.iter_search(word, filter))
 
     def results(self, word, filter):
         """
@@ -75,20 +258,24 @@ class Search:
         :param filter: choice from dropdown
         :return: result list
         """
-
-        resp = self.search(word, filter)
-        visited_words = set()
-        for x in resp:
-            visited_words.add(x)
-        anywhere = self.anywhere(word, visited_words)
-        resp.extend(anywhere)
-        return resp
+        return list(self.iter_results(word, filter))
 
     def results_top_ten(self, word, filter):
         """
         Function to get top 10 results
         """
-        return self.results(word, filter)[:10]
+        return self.suggest(word, filter, 10)
+
+    def suggest(self, word, filter, limit=SUGGESTIONS):
+        """
+        Type-ahead mode: the first limit entries of results, stopping as soon
+        as limit titles are collected
+        :param word: user input from textbox
+        :param filter: choice from dropdown
+        :param limit: number of suggestions
+        :return: result list
+        """
+        return list(islice(self.iter_results(word, filter), limit))
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,84 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+
+Application configuration, read once from the process environment and the
+.env file next to the app.
+"""
+
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+from src.prediction_scripts.catalog import WATCH_INTERVAL
+from src.recommenderapp.metadata import METADATA_DB, OMDB_URL
+
+ENV_FILE = Path(__file__).resolve().parent / ".env"
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed, immutable snapshot of the configuration
+    """
+
+    db_user: str = "root"
+    db_password: str = "root"
+    # mysql is the name of the service in the github action config, so add it as default here for testing only
+    db_host: str = "127.0.0.1"
+    db_port: int = 3306
+    db_name: str = None
+    db_pool_size: int = 5
+    db_pool_timeout: float = 10.0
+    omdb_api_key: str = None
+    streaming_api_key: str = None
+    omdb_url: str = OMDB_URL
+    omdb_fetch_workers: int = 8
+    http_connect_timeout: float = 3.05
+    http_read_timeout: float = 10.0
+    http_max_concurrency: int = 16
+    http_retries: int = 2
+    http_backoff: float = 0.2
+    omdb_cache_path: str = METADATA_DB
+    omdb_cache_size: int = 1024
+    omdb_cache_ttl: float = 7 * 24 * 3600.0
+    omdb_negative_ttl: float = 3600.0
+    recommendation_cache_size: int = 1024
+    recommendation_cache_ttl: float = 3600.0
+    # seconds the first page of the wall is served from memory
+    wall_cache_ttl: float = 5.0
+    # seconds between checks for a changed catalog, 0 disables the watcher
+    catalog_watch_interval: float = WATCH_INTERVAL
+
+    @classmethod
+    def from_env(cls, environ=None, env_file=ENV_FILE):
+        """
+        Builds settings from the upper-cased field names (DB_USER, ...).
+        Variables set in the process environment take precedence over the
+        .env file, which is read on every call.
+        """
+        values = dict(dotenv_values(env_file)) if Path(env_file).is_file() else {}
+        values.update(os.environ if environ is None else environ)
+        kwargs = {}
+        for field in fields(cls):
+            value = values.get(field.name.upper())
+            if value is not None:
+                # str, int and float fields convert from their text form
+                kwargs[field.name] = field.type(value)
+        return cls(**kwargs)
+
+    def db_connection(self):
+        """
+        Returns the mysql.connector connection arguments.
+        """
+        return {
+            "user": self.db_user,
+            "password": self.db_password,
+            "host": self.db_host,
+            "port": self.db_port,
+            "database": self.db_name,
+        }
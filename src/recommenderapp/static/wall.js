@@ -22,13 +22,20 @@ $("#backToLanding").click(function () {
 
 
 posts = []
+// cursor of the older page of posts, null on the last page
+var nextCursor = null;
 
-function loadPosts(){
+function loadPosts(before){
 
     return new Promise(function(resolve, reject){
+        var params = {include: 'metadata'};
+        if (before) {
+            params.before = before;
+        }
         $.ajax({
             type: 'GET',
             url: '/getWallData',
+            data: params,
             contentType: "application/json;charset=UTF-8",
             success: function(response) {
                 console.log(response)
@@ -82,9 +89,30 @@ function fetchMovieData(imdbID){
 async function renderPosts() {
     const postContainer = $('#post-container');
 
-    posts.forEach(post => buildPost(post, postContainer));
+    $("#olderPostsBtn").remove();
+    await Promise.allSettled(posts.map(post => buildPost(post, postContainer)));
+    if (nextCursor) {
+        postContainer.append($('<button/>', {id: 'olderPostsBtn', class: 'btn btn-primary'})
+            .text('Show older posts'));
+    }
 }
 
+async function showPage(before) {
+    try{
+        var page = await loadPosts(before);
+        posts = page.posts;
+        nextCursor = page.next_cursor;
+    } catch(error){
+        console.error(error);
+        return;
+    }
+    renderPosts();
+}
+
+$(document).on("click", "#olderPostsBtn", function () {
+    showPage(nextCursor);
+});
+
 async function buildPost(post, postContainer){
 
     var postDiv = $('<div>').addClass('post');
@@ -94,7 +122,8 @@ async function buildPost(post, postContainer){
     
     var movieData;
     try{
-        movieData = await fetchMovieData(post.imdb_id);
+        // the server attaches cached metadata, OMDB is only asked for gaps
+        movieData = post.metadata || await fetchMovieData(post.imdb_id);
     } catch(error){
         console.error(error);
     }
@@ -146,11 +175,6 @@ var loaded = false;
 $(document).ready(async function () {
     if(!loaded){
         loaded = true;
-        try{
-            posts = await loadPosts();
-        } catch(error){
-            console.error(error);
-        }
-        renderPosts();
+        showPage(null);
     }
 });
\ No newline at end of file
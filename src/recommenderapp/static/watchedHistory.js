@@ -9,6 +9,7 @@
 $(document).ready(async function () {
     try {
         const watchedMovies = await loadWatchedHistory();
+        await fillMetadata(watchedMovies);
         renderWatchedHistory(watchedMovies);
     } catch (error) {
         console.error("Error loading watched history:", error);
@@ -20,7 +21,7 @@ function loadWatchedHistory() {
     return new Promise(function (resolve, reject) {
         $.ajax({
             type: "GET",
-            url: "/getWatchedHistoryData",
+            url: "/getWatchedHistoryData?include=metadata",
             contentType: "application/json;charset=UTF-8",
             success: function (response) {
                 console.log("Watched History Data:", response); // Debugging log
@@ -33,6 +34,32 @@ function loadWatchedHistory() {
     });
 }
 
+// Movies asked about per /movies/metadata request, the server's limit
+var METADATA_BATCH = 100;
+
+// Asks the server, in batches, for the OMDB details it did not attach to
+// the rows, so OMDB itself is only asked for the movies still missing
+async function fillMetadata(rows) {
+    var missing = [...new Set(rows.filter(row => !row.metadata).map(row => row.imdb_id))];
+    for (let i = 0; i < missing.length; i += METADATA_BATCH) {
+        try {
+            const response = await fetch("/movies/metadata", {
+                method: "POST",
+                headers: {"Content-Type": "application/json"},
+                body: JSON.stringify({imdb_ids: missing.slice(i, i + METADATA_BATCH)}),
+            });
+            const data = await response.json();
+            rows.forEach(row => {
+                if (!row.metadata && data.movies && data.movies[row.imdb_id]) {
+                    row.metadata = data.movies[row.imdb_id];
+                }
+            });
+        } catch (error) {
+            console.error("Error fetching movie metadata:", error);
+        }
+    }
+}
+
 // Render watched history posts
 async function renderWatchedHistory(watchedMovies) {
     const container = $("#watchedHistoryContainer");
@@ -43,7 +70,8 @@ async function renderWatchedHistory(watchedMovies) {
         // Fetch metadata from OMDb API
         let movieData = {};
         try {
-            movieData = await fetchMovieData(movie.imdb_id);
+            // the server attaches cached metadata, OMDB is only asked for gaps
+            movieData = movie.metadata || await fetchMovieData(movie.imdb_id);
         } catch (error) {
             console.error("Error fetching movie data:", error);
         }
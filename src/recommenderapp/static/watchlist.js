@@ -28,7 +28,7 @@ function loadPosts(){
     return new Promise(function(resolve, reject){
         $.ajax({
             type: 'GET',
-            url: '/getWatchlistData',
+            url: '/getWatchlistData?include=metadata',
             contentType: "application/json;charset=UTF-8",
             success: function(response) {
                 console.log(response)
@@ -101,6 +101,32 @@ function deleteMovie(imdbID) {
     });
 }
 
+// Movies asked about per /movies/metadata request, the server's limit
+var METADATA_BATCH = 100;
+
+// Asks the server, in batches, for the OMDB details it did not attach to
+// the rows, so OMDB itself is only asked for the movies still missing
+async function fillMetadata(rows) {
+    var missing = [...new Set(rows.filter(row => !row.metadata).map(row => row.imdb_id))];
+    for (let i = 0; i < missing.length; i += METADATA_BATCH) {
+        try {
+            const response = await fetch("/movies/metadata", {
+                method: "POST",
+                headers: {"Content-Type": "application/json"},
+                body: JSON.stringify({imdb_ids: missing.slice(i, i + METADATA_BATCH)}),
+            });
+            const data = await response.json();
+            rows.forEach(row => {
+                if (!row.metadata && data.movies && data.movies[row.imdb_id]) {
+                    row.metadata = data.movies[row.imdb_id];
+                }
+            });
+        } catch (error) {
+            console.error("Error fetching movie metadata:", error);
+        }
+    }
+}
+
 async function renderPosts() {
     const postContainer = $('#post-container');
 
@@ -116,7 +142,8 @@ async function buildPost(post, postContainer){
     var deleteDiv = $('<div>').addClass('delete-data');
     var movieData;
     try{
-        movieData = await fetchMovieData(post.imdb_id);
+        // the server attaches cached metadata, OMDB is only asked for gaps
+        movieData = post.metadata || await fetchMovieData(post.imdb_id);
     } catch(error){
         console.error(error);
     }
@@ -176,6 +203,7 @@ $(document).ready(async function () {
         loaded = true;
         try{
             posts = await loadPosts();
+            await fillMetadata(posts);
         } catch(error){
             console.error(error);
         }
@@ -16,9 +16,48 @@ from smtplib import SMTPException
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import jsonify
-import json
 
-import pandas as pd
+from src.prediction_scripts.catalog import get_catalog
+
+# Comments returned per page of a movie discussion
+DISCUSSION_PAGE_SIZE = 50
+DISCUSSION_CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# Posts on the wall per page
+WALL_PAGE_SIZE = 50
+# Copies a new review into WallFeed along with its movie and user
+WALL_POST_QUERY = """
+    INSERT INTO WallFeed (rating_id, name, imdb_id, username, score, review, time)
+    SELECT %s, m.name, m.imdb_id, u.username, %s, %s, %s
+    FROM Movies m JOIN Users u ON u.idUsers = %s
+    WHERE m.idMovies = %s;
+"""
+
+# List queries, served by the (user_id, time DESC, movie_id) indexes
+WATCHLIST_QUERY = """
+    SELECT m.name, m.imdb_id, w.time
+    FROM Watchlist w
+    JOIN Movies m ON w.movie_id = m.idMovies
+    WHERE w.user_id = %s
+    ORDER BY w.time DESC;
+"""
+WATCHED_HISTORY_QUERY = """
+    SELECT m.name AS movie_name, m.imdb_id, wh.watched_date
+    FROM WatchedHistory wh
+    JOIN Movies m ON wh.movie_id = m.idMovies
+    WHERE wh.user_id = %s
+    ORDER BY wh.watched_date DESC;
+"""
+# Adds the movie matched on Movies.{key} to the {table} list of a user. The
+# user_movie_UNIQUE index turns a movie already listed into a no-op update
+# that only sets the insert id to the listed row's id{table} primary key. So
+# one row affected means added, an insert id without a row means already
+# listed, and neither means no movie matched.
+ADD_TO_LIST_QUERY = (
+    "INSERT INTO {table} (user_id, movie_id, {date}) "
+    "SELECT %s, idMovies, %s FROM Movies WHERE {key} = %s LIMIT 1 "
+    "ON DUPLICATE KEY UPDATE id{table} = LAST_INSERT_ID(id{table})"
+)
 
 
 def create_colored_tags(genres):
@@ -149,25 +188,23 @@ def send_email_to_user(recipient_email, categorized_data):
     message["From"] = sender_email
     message["To"] = recipient_email
     message["Subject"] = subject
-    # Load the CSV file into a DataFrame
-    movie_genre_df = pd.read_csv("../../data/movies.csv")
-    # Creating movie-genres map
-    movie_to_genres = create_movie_genres(movie_genre_df)
+    # Shared movie catalog used to look up the genres of each movie
+    catalog = get_catalog()
     # Create the email message with HTML content
     html_content = email_html_content.format(
         "\n".join(
             f'<li>{movie} \
-            {create_colored_tags(movie_to_genres.get(movie, ["Unknown Genre"]))}</li><br>'
+            {create_colored_tags(catalog.genres_of(movie) or ["Unknown Genre"])}</li><br>'
             for movie in categorized_data["Liked"]
         ),
         "\n".join(
             f'<li>{movie} \
-            {create_colored_tags(movie_to_genres.get(movie, ["Unknown Genre"]))}</li><br>'
+            {create_colored_tags(catalog.genres_of(movie) or ["Unknown Genre"])}</li><br>'
             for movie in categorized_data["Disliked"]
         ),
         "\n".join(
             f'<li>{movie} \
-            {create_colored_tags(movie_to_genres.get(movie, ["Unknown Genre"]))}</li><br>'
+            {create_colored_tags(catalog.genres_of(movie) or ["Unknown Genre"])}</li><br>'
             for movie in categorized_data["Yet to Watch"]
         ),
     )
@@ -215,13 +252,10 @@ def add_friend(db, username, user_id):
     executor = db.cursor()
     executor.execute("SELECT idUsers FROM Users WHERE username = %s;", [username])
     friend_id = executor.fetchall()[0][0]
+    # both directions at once; an existing friendship is left as is
     executor.execute(
-        "INSERT INTO Friends(idUsers, idFriend) VALUES (%s, %s);",
-        (int(user_id), int(friend_id)),
-    )
-    executor.execute(
-        "INSERT INTO Friends(idUsers, idFriend) VALUES (%s, %s);",
-        (int(friend_id), int(user_id)),
+        "INSERT IGNORE INTO Friends(idUsers, idFriend) VALUES (%s, %s), (%s, %s);",
+        (int(user_id), int(friend_id), int(friend_id), int(user_id)),
     )
     db.commit()
 
@@ -257,6 +291,18 @@ def submit_review(db, user, movie, score, review):
                         VALUES (%s, %s, %s, %s, %s);",
         (int(user), int(movie_id), int(score), str(review), timestamp),
     )
+    # the wall post is written with the review, in the same transaction
+    executor.execute(
+        WALL_POST_QUERY,
+        (
+            executor.lastrowid,
+            int(score),
+            str(review),
+            timestamp,
+            int(user),
+            int(movie_id),
+        ),
+    )
     db.commit()
 
 
@@ -279,6 +325,32 @@ def get_wall_posts(db):
     return jsonify(json_data)
 
 
+def get_wall_page(db, limit=WALL_PAGE_SIZE, before=None):
+    """
+    Utility function for getting one page of the wall, newest post first,
+    read from WallFeed by its primary key.
+    Returns the posts and the cursor of the older page, None on the last page.
+    :param before: cursor returned with the previous page, None for the latest
+    """
+    executor = db.cursor(dictionary=True)
+    if before is None:
+        executor.execute(
+            "SELECT idPost, name, imdb_id, review, score, username, time "
+            "FROM WallFeed ORDER BY idPost DESC LIMIT %s",
+            (limit + 1,),
+        )
+    else:
+        executor.execute(
+            "SELECT idPost, name, imdb_id, review, score, username, time "
+            "FROM WallFeed WHERE idPost < %s ORDER BY idPost DESC LIMIT %s",
+            (int(before), limit + 1),
+        )
+    posts = executor.fetchall()
+    # the extra row only tells whether an older page exists
+    next_cursor = str(posts[limit - 1]["idPost"]) if len(posts) > limit else None
+    return {"posts": posts[:limit], "next_cursor": next_cursor}
+
+
 def get_recent_movies(db, user):
     """
     Utility function for getting recent movies reviewed by a user
@@ -361,32 +433,59 @@ def get_friends(db, user):
     return jsonify(result)
 
 
+def utc_timestamp():
+    """
+    Returns the current UTC time in the DATETIME format of the list tables.
+    """
+    return datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
 def add_to_watchlist(db, user_id, movie_id, timestamp=None):
     """
     Utility function to add a movie to the user's watchlist.
     Only inserts the movie if it is not already in the user's watchlist.
     """
+    if timestamp is None:
+        timestamp = utc_timestamp()
     cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO Watchlist (user_id, movie_id, time) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE time = time",
+        (int(user_id), int(movie_id), timestamp),
+    )
+    db.commit()
+    return cursor.rowcount == 1
 
-    # Check if the movie is already in the user's watchlist
+
+def add_to_list(db, table, date_column, user_id, date, imdb_id=None, movie_name=None):
+    """
+    Adds the movie with the imdb_id, or else named movie_name, to a list table
+    of the user in one statement, which also tells the three outcomes apart.
+    Returns True if it was added, False if it was already in the list, None if
+    no movie matched.
+    """
+    key, value = ("imdb_id", imdb_id) if imdb_id else ("name", movie_name)
+    cursor = db.cursor()
     cursor.execute(
-        "SELECT 1 FROM Watchlist WHERE user_id = %s AND movie_id = %s",
-        (int(user_id), int(movie_id)),
+        ADD_TO_LIST_QUERY.format(table=table, date=date_column, key=key),
+        (user_id, date or utc_timestamp(), value),
     )
-    existing_entry = cursor.fetchone()
+    db.commit()
+    if cursor.rowcount == 1:
+        return True
+    return False if cursor.lastrowid else None
 
-    # If the movie is not already in the watchlist, add it
-    if not existing_entry:
-        if timestamp is None:
-            timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute(
-            "INSERT INTO Watchlist (user_id, movie_id, time) VALUES (%s, %s, %s);",
-            (int(user_id), int(movie_id), timestamp),
-        )
-        db.commit()
-        return True  # Indicate that the movie was added
-    else:
-        return False  # Indicate that the movie was already in the watchlist
+
+def add_to_watchlist_by_movie(
+    db, user_id, imdb_id=None, movie_name=None, timestamp=None
+):
+    """
+    Adds the movie with the imdb_id, or else named movie_name, to the user's
+    watchlist.
+    Returns True if it was added, False if it was already in the watchlist,
+    None if the movie was not found.
+    """
+    return add_to_list(db, "Watchlist", "time", user_id, timestamp, imdb_id, movie_name)
 
 
 def get_imdb_id_by_name(db, movie_name):
@@ -399,37 +498,18 @@ def get_imdb_id_by_name(db, movie_name):
     return result[0] if result else None
 
 
-def add_to_watched_history(db, user_id, imdb_id, watched_date=None):
+def add_to_watched_history(db, user_id, imdb_id, watched_date=None, movie_name=None):
     """
     Utility function to add a movie to the user's watched history.
+    The movie is looked up by movie_name when no imdb_id is given.
     """
-    cursor = db.cursor()
-
-    # Check if the movie exists in the database
-    cursor.execute("SELECT idMovies FROM Movies WHERE imdb_id = %s", [imdb_id])
-    movie_result = cursor.fetchone()
-    if not movie_result:
-        return False, "Movie not found"
-
-    movie_id = movie_result[0]
-
-    # Check if the movie is already in the user's watched history
-    cursor.execute(
-        "SELECT 1 FROM WatchedHistory WHERE user_id = %s AND movie_id = %s",
-        [user_id, movie_id],
+    added = add_to_list(
+        db, "WatchedHistory", "watched_date", user_id, watched_date, imdb_id, movie_name
     )
-    if cursor.fetchone():
+    if added is None:
+        return False, "Movie not found"
+    if not added:
         return False, "Movie already in watched history"
-
-    # Insert the movie into the user's watched history
-    watched_date = watched_date or datetime.datetime.utcnow().strftime(
-        "%Y-%m-%d %H:%M:%S"
-    )
-    cursor.execute(
-        "INSERT INTO WatchedHistory (user_id, movie_id, watched_date) VALUES (%s, %s, %s)",
-        [user_id, movie_id, watched_date],
-    )
-    db.commit()
     return True, "Movie added to watched history"
 
 
@@ -497,48 +577,185 @@ def remove_from_watchlist(db, user_id, imdb_id):
     return idMovies, "Movie removed from watchlist"
 
 
-def create_or_update_discussion(db, data):
+def find_listed_movies(db, table, user_id, movies):
     """
-    create or update comments on a discussion in DB
+    Resolves imdb ids and titles to movies with one query, along with whether
+    each movie is in the list table of the user.
+    Returns {imdb id or lower-cased title: (idMovies, listed)}.
     """
+    placeholders = ", ".join(["%s"] * len(movies))
     cursor = db.cursor()
     cursor.execute(
-        "SELECT * from Discussion where imdb_id = %s LIMIT 1", (data["imdb_id"],)
+        f"""
+        SELECT m.idMovies, m.imdb_id, m.name, l.movie_id IS NOT NULL
+        FROM Movies m
+        LEFT JOIN {table} l ON l.movie_id = m.idMovies AND l.user_id = %s
+        WHERE m.imdb_id IN ({placeholders}) OR m.name IN ({placeholders})
+        ORDER BY m.idMovies;
+        """,
+        [user_id, *movies, *movies],
     )
-    result = cursor.fetchone()
-    if result == None:
-        comments = [{"user": data["user"], "comment": data["comment"]}]
-        cursor.execute(
-            "Insert INTO Discussion (imdb_id, comments) values(%s,%s)",
-            (data["imdb_id"], json.dumps(comments)),
-        )
+    found = {}
+    for movie_id, imdb_id, name, listed in cursor.fetchall():
+        found.setdefault(imdb_id, (movie_id, bool(listed)))
+        # titles compare case-insensitively, like the column collation
+        found.setdefault(name.lower(), (movie_id, bool(listed)))
+    return found
+
+
+def match_movie(found, movie):
+    """
+    Returns the find_listed_movies entry of an imdb id or title, or None.
+    """
+    return found.get(movie) or found.get(movie.lower())
+
+
+def bulk_add_to_list(db, table, date_column, user_id, movies, date=None):
+    """
+    Adds many movies, given by imdb id or title, to a list table of the user
+    in one transaction: one query resolves them, one executemany inserts the
+    new ones.
+    Returns the status of every movie: added, already_listed or not_found.
+    """
+    date = date or utc_timestamp()
+    try:
+        found = find_listed_movies(db, table, user_id, movies)
+        results, rows, seen = [], [], set()
+        for movie in movies:
+            match = match_movie(found, movie)
+            if match is None:
+                status = "not_found"
+            elif match[1] or match[0] in seen:
+                status = "already_listed"
+            else:
+                status = "added"
+                seen.add(match[0])
+                rows.append((user_id, match[0], date))
+            results.append({"movie": movie, "status": status})
+        if rows:
+            # a row listed since the lookup is left as it is
+            db.cursor().executemany(
+                f"INSERT INTO {table} (user_id, movie_id, {date_column}) "
+                "VALUES (%s, %s, %s) "
+                f"ON DUPLICATE KEY UPDATE {date_column} = {date_column}",
+                rows,
+            )
         db.commit()
-    else:
-        comments = json.loads(result[2])
-        comments.append({"user": data["user"], "comment": data["comment"]})
-        cursor.execute(
-            "Update Discussion set comments = %s where imdb_id = %s",
-            (
-                json.dumps(comments),
-                data["imdb_id"],
-            ),
-        )
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+
+def bulk_remove_from_list(db, table, user_id, movies):
+    """
+    Removes many movies, given by imdb id or title, from a list table of the
+    user in one transaction: one query resolves them, one DELETE removes the
+    listed ones.
+    Returns the status of every movie: removed, not_listed or not_found.
+    """
+    try:
+        found = find_listed_movies(db, table, user_id, movies)
+        results, movie_ids = [], set()
+        for movie in movies:
+            match = match_movie(found, movie)
+            if match is None:
+                status = "not_found"
+            elif not match[1] or match[0] in movie_ids:
+                status = "not_listed"
+            else:
+                status = "removed"
+                movie_ids.add(match[0])
+            results.append({"movie": movie, "status": status})
+        if movie_ids:
+            placeholders = ", ".join(["%s"] * len(movie_ids))
+            db.cursor().execute(
+                f"DELETE FROM {table} WHERE user_id = %s "
+                f"AND movie_id IN ({placeholders})",
+                [user_id, *movie_ids],
+            )
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+
+def create_or_update_discussion(db, data):
+    """
+    Appends a comment to the discussion of a movie, one row per comment,
+    so posting costs the same however long the discussion is
+    """
+    created_at = datetime.datetime.utcnow()
+    cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO DiscussionComments (imdb_id, user, comment, created_at) "
+        "VALUES (%s, %s, %s, %s)",
+        (data["imdb_id"], data["user"], data["comment"], created_at),
+    )
+    db.commit()
+    comment = {
+        "id": cursor.lastrowid,
+        "user": data["user"],
+        "comment": data["comment"],
+        "created_at": created_at.isoformat(),
+    }
+    return (jsonify([comment]), 200)
+
+
+def encode_discussion_cursor(created_at, comment_id):
+    """
+    Builds the opaque cursor pointing before a comment.
+    """
+    return f"{created_at.strftime(DISCUSSION_CURSOR_FORMAT)}/{comment_id}"
+
+
+def decode_discussion_cursor(cursor):
+    """
+    Inverse of encode_discussion_cursor, raises ValueError on bad cursors.
+    """
+    created_at, _, comment_id = cursor.partition("/")
     return (
-        jsonify(
-            [
-                {"user": data["user"], "comment": data["comment"]},
-            ]
-        ),
-        200,
+        datetime.datetime.strptime(created_at, DISCUSSION_CURSOR_FORMAT),
+        int(comment_id),
     )
 
 
-def get_discussion(db, imdb_id):
+def get_discussion(db, imdb_id, limit=DISCUSSION_PAGE_SIZE, before=None):
     """
-    Get the discussion on the movie with imdb_id
+    Get a page of the discussion on the movie with imdb_id: the latest
+    limit comments older than the before cursor, oldest first, and the
+    cursor of the next (older) page, None on the last one
     """
     cursor = db.cursor()
-    cursor.execute("SELECT comments from Discussion where imdb_id = %s", (imdb_id,))
-    result = cursor.fetchone()
-    return (jsonify(json.loads(result[0])), 200)
+    if before is None:
+        cursor.execute(
+            "SELECT idComment, user, comment, created_at FROM DiscussionComments "
+            "WHERE imdb_id = %s "
+            "ORDER BY created_at DESC, idComment DESC LIMIT %s",
+            (imdb_id, limit + 1),
+        )
+    else:
+        created_at, comment_id = decode_discussion_cursor(before)
+        cursor.execute(
+            "SELECT idComment, user, comment, created_at FROM DiscussionComments "
+            "WHERE imdb_id = %s AND (created_at < %s "
+            "OR (created_at = %s AND idComment < %s)) "
+            "ORDER BY created_at DESC, idComment DESC LIMIT %s",
+            (imdb_id, created_at, created_at, comment_id, limit + 1),
+        )
+    rows = cursor.fetchall()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_discussion_cursor(page[-1][3], page[-1][0])
+    comments = [
+        {
+            "id": comment_id,
+            "user": user,
+            "comment": comment,
+            "created_at": created_at.isoformat(),
+        }
+        for comment_id, user, comment, created_at in reversed(page)
+    ]
+    return (jsonify({"comments": comments, "next_cursor": next_cursor}), 200)
@@ -0,0 +1,138 @@
+"""
+Copyright (c) 2023 Aditya Pai, Ananya Mantravadi, Rishi Singhal, Samarth Shetty
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import sys
+import unittest
+import warnings
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.prediction_scripts.cache import LRUCache
+from src.prediction_scripts.catalog import MovieCatalog
+from src.prediction_scripts.item_based import (
+    recommend,
+    recommend_for_new_user_g,
+    recommendation_cache,
+    WEIGHTS,
+)
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+MOVIES = pd.DataFrame(
+    {
+        "movieId": [1, 2, 3],
+        "title": ["Toy Story (1995)", "Toy Story 2 (1999)", "Heat (1995)"],
+        "genres": ["Animation|Comedy", "Animation|Comedy", "Action|Crime"],
+        "imdb_id": ["tt0114709", "tt0120363", "tt0113277"],
+        "director": ["John Lasseter", "John Lasseter", "Michael Mann"],
+        "actors": ["Tom Hanks,Tim Allen", "Tom Hanks", "Al Pacino"],
+        "imdb_ratings": ["8.3", "7.9", "8.3"],
+    }
+)
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the LRU cache and the recommendation cache
+    """
+
+    def setUp(self):
+        recommendation_cache.clear()
+
+    def test_get_put(self):
+        """
+        Test case 1
+        """
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_eviction(self):
+        """
+        Test case 2
+        """
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl(self):
+        """
+        Test case 3
+        """
+        cache = LRUCache(maxsize=2, ttl=10)
+        with patch("src.prediction_scripts.cache.time.monotonic", return_value=100):
+            cache.put("a", 1)
+        with patch("src.prediction_scripts.cache.time.monotonic", return_value=105):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("src.prediction_scripts.cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_recommendation_hit(self):
+        """
+        Test case 4
+        """
+        catalog = MovieCatalog.from_frame(MOVIES)
+        catalog.version = 1
+        ts = [{"title": "Toy Story (1995)", "rating": 5.0}]
+        heat = [{"title": "Heat (1995)", "rating": 4.0}]
+        with patch(
+            "src.prediction_scripts.item_based.get_catalog", return_value=catalog
+        ):
+            first = recommend_for_new_user_g(ts + heat)
+            second = recommend_for_new_user_g(heat + ts)
+            # a repeated seed weighs twice in the profile, so it is its own entry
+            recommend_for_new_user_g(ts + ts + heat)
+        self.assertEqual(first, second)
+        self.assertEqual(recommendation_cache.stats()["size"], 2)
+        self.assertEqual(recommendation_cache.stats()["hits"], 1)
+
+    def test_recommendation_catalog_version(self):
+        """
+        Test case 5
+        """
+        ts = [{"title": "Toy Story (1995)", "rating": 5.0}]
+        for version in (1, 2):
+            catalog = MovieCatalog.from_frame(MOVIES)
+            catalog.version = version
+            with patch(
+                "src.prediction_scripts.item_based.get_catalog", return_value=catalog
+            ):
+                recommend(ts, WEIGHTS["all"], 5)
+        self.assertEqual(recommendation_cache.stats()["size"], 2)
+
+    def test_configure(self):
+        """
+        Test case 6
+        """
+        cache = LRUCache(maxsize=3)
+        for key in "abc":
+            cache.put(key, key)
+        cache.configure(maxsize=1, ttl=60)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get("c"), "c")
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertEqual(cache.ttl, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
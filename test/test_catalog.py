@@ -0,0 +1,383 @@
+"""
+Copyright (c) 2023 Aditya Pai, Ananya Mantravadi, Rishi Singhal, Samarth Shetty
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.prediction_scripts import catalog
+from src.prediction_scripts.catalog import (
+    CatalogWatcher,
+    MovieCatalog,
+    artifact_is_fresh,
+    build_artifact,
+    catalog_status,
+    current_artifact,
+    get_catalog,
+    load_catalog,
+    merge_deltas,
+    new_delta_path,
+    read_catalog,
+    refresh_catalog,
+    reload_in_background,
+)
+from src.prediction_scripts.item_based import (
+    WEIGHTS,
+    recommend_batch,
+    recommendation_cache,
+    top_k,
+    recommend_for_new_user,
+    recommend_for_new_user_a,
+    recommend_for_new_user_d,
+    recommend_for_new_user_g,
+)
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+COLUMNS = [
+    "movieId",
+    "title",
+    "genres",
+    "imdb_id",
+    "overview",
+    "poster_path",
+    "runtime",
+    "director",
+    "actors",
+    "imdb_ratings",
+]
+
+MOVIES = [
+    [1, "Toy Story (1995)", "Animation|Comedy|Family", "tt0114709", "", "", 81,
+     "John Lasseter", "Tom Hanks,Tim Allen", "8.3"],
+    [2, "Jumanji (1995)", "Adventure|Fantasy|Family", "tt0113497", "", "", 104,
+     "Joe Johnston", "Robin Williams,Kirsten Dunst", "7.1"],
+    [3, "Toy Story 2 (1999)", "Animation|Comedy|Family", "tt0120363", "", "", 92,
+     "John Lasseter", "Tom Hanks,Tim Allen", "7.9"],
+    [4, "Heat (1995)", "Action|Crime|Drama", "tt0113277", "", "", 170,
+     "Michael Mann", "Al Pacino,Robert De Niro", "Error"],
+    [5, "Big (1988)", "Comedy|Drama", "tt0094737", "", "", 104,
+     "Penny Marshall", "Tom Hanks", "No Rating Found"],
+]  # fmt: skip
+
+
+def make_catalog():
+    """
+    Builds a small in-memory catalog
+    """
+    return MovieCatalog.from_frame(pd.DataFrame(MOVIES, columns=COLUMNS))
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the preprocessed movie catalog
+    """
+
+    def setUp(self):
+        recommendation_cache.clear()
+        self.catalog = make_catalog()
+        self.patcher = patch(
+            "src.prediction_scripts.item_based.get_catalog",
+            return_value=self.catalog,
+        )
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_genre_matrix(self):
+        """
+        Test case 1
+        """
+        self.assertEqual(
+            self.catalog.genre_names[:4], ["Animation", "Comedy", "Family", "Adventure"]
+        )
+        self.assertEqual(self.catalog.genre_matrix.shape, (5, 8))
+        self.assertEqual(list(self.catalog.genre_matrix.sum(axis=1)), [3, 3, 3, 3, 2])
+
+    def test_title_index(self):
+        """
+        Test case 2
+        """
+        self.assertEqual(self.catalog.title_rows["Heat (1995)"], [3])
+        self.assertNotIn("Unknown (2000)", self.catalog.title_rows)
+
+    def test_people(self):
+        """
+        Test case 3
+        """
+        actors = self.catalog.actors
+        tom_hanks = actors.ids["Tom Hanks"]
+        self.assertEqual(list(actors.movies_of(tom_hanks)), [0, 2, 4])
+        self.assertEqual(
+            {actors.names[x] for x in actors.people_of([0])}, {"Tom Hanks", "Tim Allen"}
+        )
+        directors = self.catalog.directors
+        self.assertEqual(
+            [directors.names[x] for x in directors.people_of([3])], ["Michael Mann"]
+        )
+
+    def test_match_scores(self):
+        """
+        Test case 4
+        """
+        actors = self.catalog.actors
+        scores = actors.match_scores(actors.people_of([0]))
+        self.assertEqual(list(scores), [2, 0, 2, 0, 1])
+        self.assertEqual(list(actors.match_scores([])), [0, 0, 0, 0, 0])
+
+    def test_missing_ratings(self):
+        """
+        Test case 5
+        """
+        ratings = self.catalog.imdb_ratings
+        self.assertEqual(ratings.dtype, np.float32)
+        self.assertTrue(np.isnan(ratings[3:]).all())
+        self.assertAlmostEqual(float(ratings[0]), 8.3, places=5)
+        normalized = self.catalog.normalized_ratings
+        self.assertEqual(normalized.max(), 1.0)
+        self.assertAlmostEqual(float(normalized[3]), 1.0 / 8.3, places=5)
+
+    def test_recommend_genre(self):
+        """
+        Test case 6
+        """
+        ts = [{"title": "Toy Story (1995)", "rating": 5.0}]
+        recommendations, genres, imdb_ids = recommend_for_new_user_g(ts)
+        self.assertEqual(recommendations[0], "Toy Story 2 (1999)")
+        self.assertEqual(genres[0], "Animation|Comedy|Family")
+        self.assertEqual(imdb_ids[0], "tt0120363")
+        self.assertNotIn("Toy Story (1995)", recommendations)
+        self.assertEqual(len(recommendations), 4)
+
+    def test_recommend_actor(self):
+        """
+        Test case 7
+        """
+        ts = [{"title": "Big (1988)", "rating": 5.0}]
+        recommendations, _, _ = recommend_for_new_user_a(ts)
+        self.assertEqual(
+            set(recommendations[:2]), {"Toy Story (1995)", "Toy Story 2 (1999)"}
+        )
+
+    def test_recommend_director(self):
+        """
+        Test case 8
+        """
+        ts = [{"title": "Toy Story 2 (1999)", "rating": 5.0}]
+        recommendations, _, _ = recommend_for_new_user_d(ts)
+        self.assertEqual(recommendations[0], "Toy Story (1995)")
+
+    def test_unknown_movie(self):
+        """
+        Test case 9
+        """
+        ts = [{"title": "Unknown (2000)", "rating": 5.0}]
+        recommendations, _, _ = recommend_for_new_user(ts, 1, 0, 0)
+        self.assertEqual(len(recommendations), 5)
+
+    def test_top_k(self):
+        """
+        Test case 10
+        """
+        scores = np.array([0.5, np.nan, 2.0, 0.5, 3.0, 0.5])
+        self.assertEqual(list(top_k(scores, 3)), [4, 2, 0])
+        self.assertEqual(list(top_k(scores, 4)), [4, 2, 0, 3])
+        self.assertEqual(list(top_k(scores, 10)), [4, 2, 0, 3, 5, 1])
+
+    def test_recommend_k(self):
+        """
+        Test case 11
+        """
+        ts = [{"title": "Toy Story (1995)", "rating": 5.0}]
+        recommendations, genres, imdb_ids = recommend_for_new_user_g(ts, 2)
+        self.assertEqual(len(recommendations), 2)
+        self.assertEqual(len(genres), 2)
+        self.assertEqual(len(imdb_ids), 2)
+        self.assertEqual(recommendations, recommend_for_new_user_g(ts)[0][:2])
+
+    def test_recommend_batch(self):
+        """
+        Test case 12
+        """
+        users = [
+            [{"title": "Toy Story (1995)", "rating": 5.0}],
+            [{"title": "Heat (1995)", "rating": 5.0}],
+            [{"title": "Unknown (2000)", "rating": 5.0}],
+        ]
+        results = recommend_batch(users, WEIGHTS["all"], 3)
+        self.assertEqual(len(results), 3)
+        for user_rating, result in zip(users, results):
+            self.assertEqual(
+                result, recommend_for_new_user(user_rating, 0.5, 0.3, 0.3, 3)
+            )
+
+    def test_artifact(self):
+        """
+        Test case 13
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "movies.csv")
+            catalog_dir = os.path.join(tmp, "catalog")
+            pd.DataFrame(MOVIES, columns=COLUMNS).to_csv(csv_path, index=False)
+            path = build_artifact(csv_path, catalog_dir)
+            self.assertTrue(artifact_is_fresh(path, csv_path))
+
+            loaded = read_catalog(csv_path, catalog_dir)
+            self.assertIsInstance(loaded.genre_matrix, np.memmap)
+            self.assertEqual(list(loaded.titles), list(self.catalog.titles))
+            self.assertIsInstance(loaded.titles.buffer, np.memmap)
+            self.assertEqual(loaded.imdb_ids[-1], "tt0094737")
+            rows = np.array([3, 0])
+            self.assertEqual(
+                loaded.titles[rows].tolist(), self.catalog.titles[rows].tolist()
+            )
+            mask = self.catalog.imdb_ratings > 8
+            self.assertEqual(list(loaded.imdb_ids[mask]), ["tt0114709"])
+            self.assertEqual(loaded.genre_names, self.catalog.genre_names)
+            self.assertEqual(loaded.actors.names, self.catalog.actors.names)
+            self.assertEqual(
+                loaded.genres_of("Heat (1995)"), ["Action", "Crime", "Drama"]
+            )
+            ts = [{"title": "Toy Story (1995)", "rating": 5.0}]
+            expected = recommend_for_new_user(ts, 0.5, 0.3, 0.3)
+            with patch(
+                "src.prediction_scripts.item_based.get_catalog", return_value=loaded
+            ):
+                self.assertEqual(recommend_for_new_user(ts, 0.5, 0.3, 0.3), expected)
+
+            os.utime(csv_path, ns=(0, 0))
+            self.assertFalse(artifact_is_fresh(path, csv_path))
+
+    def test_rating_deltas(self):
+        """
+        Test case 14
+        """
+        self.assertTrue(np.isnan(self.catalog.rating_fetched_at[3]))
+        self.assertEqual(self.catalog.rating_fetched_at[4], 0.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "movies.csv")
+            catalog_dir = os.path.join(tmp, "catalog")
+            pd.DataFrame(MOVIES, columns=COLUMNS).to_csv(csv_path, index=False)
+            os.utime(csv_path, (100, 100))
+            build_artifact(csv_path, catalog_dir)
+            self.assertIsNone(merge_deltas(csv_path, catalog_dir))
+
+            records = [
+                {"imdb_id": "tt0113277", "rating": 8.3, "fetched_at": 200.0},
+                {"imdb_id": "tt0114709", "rating": 9.9, "fetched_at": 50.0},
+                {"imdb_id": "tt0094737", "rating": 7.3, "fetched_at": 200.0},
+            ]
+            with open(new_delta_path(catalog_dir), "w", encoding="utf8") as fh:
+                fh.writelines(json.dumps(record) + "\n" for record in records)
+                fh.write('{"imdb_id": "tt01')
+            path = merge_deltas(csv_path, catalog_dir)
+            self.assertIsNotNone(path)
+            self.assertEqual(os.path.getmtime(csv_path), 100)
+
+            loaded = read_catalog(csv_path, catalog_dir)
+            self.assertEqual(loaded.path, path)
+            self.assertTrue(np.allclose(loaded.imdb_ratings, [8.3, 7.1, 7.9, 8.3, 7.3]))
+            self.assertEqual(loaded.rating_fetched_at[3], 200.0)
+            self.assertEqual(len(loaded.deltas), 1)
+            self.assertIsNone(merge_deltas(csv_path, catalog_dir))
+
+            # a rebuilt CSV keeps the ratings of the deltas
+            os.utime(csv_path, (150, 150))
+            loaded = read_catalog(csv_path, catalog_dir)
+            self.assertEqual(loaded.imdb_ratings[3], np.float32(8.3))
+            self.assertEqual(loaded.imdb_ratings[0], np.float32(8.3))
+
+    def wait_for_version(self, version):
+        deadline = time.monotonic() + 10
+        while get_catalog().version <= version or catalog_status()["reloading"]:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_hot_reload(self):
+        """
+        Test case 15
+        """
+        builders = {"titles": lambda catalog: set(catalog.titles)}
+        with tempfile.TemporaryDirectory() as tmp, patch(
+            "src.prediction_scripts.catalog._catalog", None
+        ), patch.dict(
+            "src.prediction_scripts.catalog._index_builders", builders, clear=True
+        ):
+            csv_path = os.path.join(tmp, "movies.csv")
+            catalog_dir = os.path.join(tmp, "catalog")
+            pd.DataFrame(MOVIES, columns=COLUMNS).to_csv(csv_path, index=False)
+            build_artifact(csv_path, catalog_dir)
+            first = load_catalog(csv_path, catalog_dir)
+            self.assertIn("Heat (1995)", first.indexes["titles"])
+            self.assertGreaterEqual(first.build_seconds, 0)
+            self.assertFalse(refresh_catalog(csv_path, catalog_dir))
+
+            record = {"imdb_id": "tt0113277", "rating": 8.3, "fetched_at": 1e10}
+            with open(new_delta_path(catalog_dir), "w", encoding="utf8") as fh:
+                fh.write(json.dumps(record) + "\n")
+            merge_deltas(csv_path, catalog_dir)
+            self.assertTrue(refresh_catalog(csv_path, catalog_dir))
+            second = get_catalog()
+            self.assertGreater(second.version, first.version)
+            self.assertIn("titles", second.indexes)
+            self.assertEqual(second.imdb_ratings[3], np.float32(8.3))
+            # readers holding the old version are not affected
+            self.assertTrue(np.isnan(first.imdb_ratings[3]))
+            status = catalog_status()
+            self.assertEqual(status["version"], second.version)
+            self.assertEqual(status["artifact"], current_artifact(catalog_dir))
+
+            self.assertTrue(reload_in_background(csv_path, catalog_dir))
+            self.wait_for_version(second.version)
+            self.assertIsNone(catalog_status()["last_error"])
+
+            watcher = CatalogWatcher(0.01, csv_path, catalog_dir)
+            watcher.start()
+            version = get_catalog().version
+            os.utime(csv_path, (100, 100))
+            self.wait_for_version(version)
+            watcher.stop()
+            watcher.join()
+            self.assertIsNone(get_catalog().path)
+
+    def test_first_load(self):
+        """
+        Test case 16
+        """
+        locks = []
+
+        def build():
+            locks.append((catalog._build_lock.locked(), catalog._catalog_lock.locked()))
+            time.sleep(0.05)
+            return make_catalog()
+
+        with patch.object(catalog, "_catalog", None), patch.object(
+            catalog, "build_catalog", side_effect=build
+        ):
+            with ThreadPoolExecutor(4) as pool:
+                loaded = list(pool.map(lambda _: get_catalog(), range(4)))
+            self.assertEqual(locks, [(True, False)])
+            self.assertTrue(all(c is loaded[0] for c in loaded))
+            self.assertIs(get_catalog(), loaded[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
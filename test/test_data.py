@@ -0,0 +1,172 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import json
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.recommenderapp.data import (
+    RateLimiter,
+    fixture_fetcher,
+    main,
+    read_checkpoint,
+    update_catalog_ratings,
+    update_csv_with_rating,
+)
+from src.prediction_scripts.catalog import current_artifact, read_catalog
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+MOVIES = pd.DataFrame(
+    {
+        "movieId": [1, 2, 3, 4],
+        "title": ["Toy Story (1995)", "Heat (1995)", "Big (1988)", "Unknown (2000)"],
+        "imdb_id": ["tt0114709", "tt0113277", "tt0094737", "tt0000000"],
+        "imdb_ratings": [8.3, None, "Error", None],
+    }
+)
+RATINGS = {"tt0114709": 9.9, "tt0113277": 8.3, "tt0094737": 7.3}
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the ratings enrichment pipeline, run offline
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        self.csv = str(self.dir / "movies.csv")
+        self.checkpoint = str(self.dir / "checkpoint.jsonl")
+        MOVIES.to_csv(self.csv, index=False)
+        self.calls = []
+
+    def fetcher(self, imdb_id):
+        self.calls.append(imdb_id)
+        return RATINGS.get(imdb_id)
+
+    def ratings(self):
+        df = pd.read_csv(self.csv)
+        return dict(zip(df["imdb_id"], df["imdb_ratings"].astype(str)))
+
+    def test_fills_missing(self):
+        """
+        Test case 1
+        """
+        update_csv_with_rating(self.csv, self.checkpoint, self.fetcher, rate=0)
+        self.assertEqual(sorted(self.calls), ["tt0000000", "tt0094737", "tt0113277"])
+        self.assertEqual(
+            self.ratings(),
+            {
+                "tt0114709": "8.3",
+                "tt0113277": "8.3",
+                "tt0094737": "7.3",
+                "tt0000000": "No Rating Found",
+            },
+        )
+
+    def test_resume(self):
+        """
+        Test case 2
+        """
+        with open(self.checkpoint, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"imdb_id": "tt0113277", "rating": 8.3}) + "\n")
+            file.write('{"imdb_id": "tt00947')
+        update_csv_with_rating(self.csv, self.checkpoint, self.fetcher, rate=0)
+        self.assertEqual(sorted(self.calls), ["tt0000000", "tt0094737"])
+        self.assertEqual(len(read_checkpoint(self.checkpoint)), 3)
+        self.assertEqual(self.ratings()["tt0113277"], "8.3")
+
+    def test_failures_retried(self):
+        """
+        Test case 3
+        """
+
+        def flaky(imdb_id):
+            if imdb_id == "tt0094737":
+                raise ConnectionError("offline")
+            return RATINGS.get(imdb_id)
+
+        update_csv_with_rating(self.csv, self.checkpoint, flaky, rate=0)
+        self.assertEqual(self.ratings()["tt0094737"], "Error")
+        update_csv_with_rating(self.csv, self.checkpoint, self.fetcher, rate=0)
+        self.assertEqual(self.calls, ["tt0094737"])
+        self.assertEqual(self.ratings()["tt0094737"], "7.3")
+
+    def test_rate_limiter(self):
+        """
+        Test case 4
+        """
+        limiter = RateLimiter(50)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_cli_fixture(self):
+        """
+        Test case 5
+        """
+        fixture = self.dir / "ratings.json"
+        fixture.write_text(json.dumps(RATINGS))
+        self.assertEqual(fixture_fetcher(fixture)("tt0113277"), 8.3)
+        main(
+            [
+                "--csv",
+                self.csv,
+                "--checkpoint",
+                self.checkpoint,
+                "--fixture",
+                str(fixture),
+                "--rate",
+                "0",
+                "--checkpoint-every",
+                "1",
+            ]
+        )
+        self.assertEqual(self.ratings()["tt0113277"], "8.3")
+
+    def test_incremental(self):
+        """
+        Test case 6
+        """
+        movies = MOVIES.assign(genres="Drama", director="", actors="")
+        movies.to_csv(self.csv, index=False)
+        catalog_dir = str(self.dir / "catalog")
+        update_catalog_ratings(self.csv, catalog_dir, self.fetcher, rate=0)
+        self.assertEqual(sorted(self.calls), ["tt0000000", "tt0094737", "tt0113277"])
+        self.assertEqual(self.ratings()["tt0113277"], "nan")
+        catalog = read_catalog(self.csv, catalog_dir)
+        self.assertTrue(
+            np.allclose(catalog.imdb_ratings, [8.3, 8.3, 7.3, np.nan], equal_nan=True)
+        )
+
+        self.calls.clear()
+        path = current_artifact(catalog_dir)
+        self.assertIsNone(update_catalog_ratings(self.csv, catalog_dir, self.fetcher))
+        self.assertEqual(self.calls, [])
+        self.assertEqual(current_artifact(catalog_dir), path)
+
+        update_catalog_ratings(self.csv, catalog_dir, self.fetcher, max_age=0, rate=0)
+        self.assertEqual(len(self.calls), 4)
+        ratings = read_catalog(self.csv, catalog_dir).imdb_ratings
+        self.assertEqual(ratings[0], np.float32(9.9))
+
+
+if __name__ == "__main__":
+    unittest.main()
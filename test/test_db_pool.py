@@ -0,0 +1,124 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import sys
+import threading
+import unittest
+import warnings
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from mysql.connector import errors
+from src.recommenderapp.db import ConnectionPool
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the database connection pool
+    """
+
+    def setUp(self):
+        patcher = patch("src.recommenderapp.db.pooling.MySQLConnectionPool")
+        self.mysql_pool = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opened_on_first_checkout(self):
+        """
+        Test case 1
+        """
+        pool = ConnectionPool(size=2, settings={"user": "root"})
+        self.mysql_pool.assert_not_called()
+        pool.checkout()
+        pool.checkout()
+        self.mysql_pool.assert_called_once_with(
+            pool_name="popcornpicks", pool_size=2, user="root"
+        )
+
+    def test_checkout_release(self):
+        """
+        Test case 2
+        """
+        pool = ConnectionPool(size=2, settings={})
+        connection = pool.checkout()
+        self.assertEqual(pool.stats()["in_use"], 1)
+        pool.release(connection)
+        connection.close.assert_called_once()
+        stats = pool.stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["size"], 2)
+
+    def test_timeout(self):
+        """
+        Test case 3
+        """
+        pool = ConnectionPool(size=1, timeout=0.01, settings={})
+        pool.checkout()
+        with self.assertRaises(errors.PoolError):
+            pool.checkout()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_failed_checkout_frees_slot(self):
+        """
+        Test case 4
+        """
+        pool = ConnectionPool(size=1, timeout=0.01, settings={})
+        self.mysql_pool.return_value.get_connection.side_effect = [
+            errors.InterfaceError("down"),
+            "connection",
+        ]
+        with self.assertRaises(errors.InterfaceError):
+            pool.checkout()
+        self.assertEqual(pool.checkout(), "connection")
+
+    def test_wait_for_release(self):
+        """
+        Test case 5
+        """
+        pool = ConnectionPool(size=1, timeout=5, settings={})
+        connection = pool.checkout()
+        releaser = threading.Timer(0.05, pool.release, [connection])
+        releaser.start()
+        pool.checkout()
+        releaser.join()
+        stats = pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertGreater(stats["max_wait_seconds"], 0)
+        self.assertGreaterEqual(
+            stats["max_checkout_seconds"], stats["max_wait_seconds"]
+        )
+
+    def test_close(self):
+        """
+        Test case 6
+        """
+        pool = ConnectionPool(size=2, settings={})
+        connection = pool.checkout()
+        remove = self.mysql_pool.return_value._remove_connections
+        pool.close()
+        # idle connections go now, the checked out one when it comes back
+        remove.assert_called_once()
+        pool.release(connection)
+        connection.close.assert_called_once()
+        self.assertEqual(remove.call_count, 2)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_close_unopened(self):
+        """
+        Test case 7
+        """
+        ConnectionPool(size=2, settings={}).close()
+        self.mysql_pool.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
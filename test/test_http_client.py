@@ -0,0 +1,180 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import sys
+import threading
+import time
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.recommenderapp.http_client import HttpClient
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+
+class FakeServer(BaseHTTPRequestHandler):
+    """
+    Answers /ok, /slow?s=seconds and /flaky (503 for the first failures
+    requests), keeping track of connections and requests in flight
+    """
+
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    requests = 0
+    clients = set()
+    failures = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serves one request.
+        """
+        url = urlparse(self.path)
+        with FakeServer.lock:
+            FakeServer.requests += 1
+            FakeServer.clients.add(self.client_address)
+            FakeServer.in_flight += 1
+            FakeServer.max_in_flight = max(
+                FakeServer.max_in_flight, FakeServer.in_flight
+            )
+            status = 200
+            if url.path == "/flaky" and FakeServer.failures > 0:
+                FakeServer.failures -= 1
+                status = 503
+        if url.path == "/slow":
+            time.sleep(float(parse_qs(url.query)["s"][0]))
+        with FakeServer.lock:
+            FakeServer.in_flight -= 1
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    """
+    Fake server that ignores clients hanging up after a timeout
+    """
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the outbound HTTP client, against a local fake server
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = QuietServer(("127.0.0.1", 0), FakeServer)
+        cls.host = f"127.0.0.1:{cls.server.server_port}"
+        cls.url = f"http://{cls.host}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeServer.requests = 0
+        FakeServer.max_in_flight = 0
+        FakeServer.failures = 0
+        FakeServer.clients = set()
+
+    def test_keep_alive(self):
+        """
+        Test case 1
+        """
+        client = HttpClient()
+        for _ in range(5):
+            self.assertEqual(client.get(self.url + "/ok").status_code, 200)
+        self.assertEqual(len(FakeServer.clients), 1)
+        client.close()
+
+    def test_histogram(self):
+        """
+        Test case 2
+        """
+        client = HttpClient()
+        client.get(self.url + "/ok", params={"i": "tt0114709"})
+        client.get(self.url + "/slow", params={"s": "0.3"})
+        stats = client.stats()[self.host]
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["buckets"]["0.5"], 1)
+        self.assertEqual(sum(stats["buckets"].values()), 2)
+        self.assertGreaterEqual(stats["total_seconds"], 0.3)
+
+    def test_retry_status(self):
+        """
+        Test case 3
+        """
+        FakeServer.failures = 2
+        client = HttpClient(retries=2, backoff=0)
+        self.assertEqual(client.get(self.url + "/flaky").status_code, 200)
+        self.assertEqual(client.stats()[self.host]["retries"], 2)
+        FakeServer.failures = 5
+        self.assertEqual(client.get(self.url + "/flaky").status_code, 503)
+        self.assertEqual(FakeServer.requests, 6)
+
+    def test_timeout(self):
+        """
+        Test case 4
+        """
+        client = HttpClient(read_timeout=0.05, retries=1, backoff=0)
+        with self.assertRaises(requests.Timeout):
+            client.get(self.url + "/slow", params={"s": "0.3"})
+        stats = client.stats()[self.host]
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["retries"], 1)
+
+    def test_connection_refused(self):
+        """
+        Test case 5
+        """
+        with QuietServer(("127.0.0.1", 0), FakeServer) as closed:
+            url = f"http://127.0.0.1:{closed.server_port}/ok"
+        client = HttpClient(retries=1, backoff=0)
+        with self.assertRaises(requests.ConnectionError):
+            client.get(url)
+
+    def test_bounded_concurrency(self):
+        """
+        Test case 6
+        """
+        client = HttpClient(max_concurrency=2)
+        with ThreadPoolExecutor(6) as pool:
+            list(
+                pool.map(
+                    lambda _: client.get(self.url + "/slow", params={"s": "0.05"}),
+                    range(6),
+                )
+            )
+        self.assertEqual(FakeServer.requests, 6)
+        self.assertLessEqual(FakeServer.max_in_flight, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
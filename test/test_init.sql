@@ -56,6 +56,7 @@ CREATE TABLE IF NOT EXISTS Friends (
   idUsers INT NOT NULL,
   idFriend INT NOT NULL,
   PRIMARY KEY (idFriendship),
+  UNIQUE INDEX user_friend_UNIQUE (idUsers, idFriend),
   CONSTRAINT idUsers
     FOREIGN KEY (idUsers)
     REFERENCES Users (idUsers)
@@ -74,6 +75,8 @@ CREATE TABLE IF NOT EXISTS Watchlist (
   movie_id INT NOT NULL,
   time DATETIME NOT NULL,
   PRIMARY KEY (idWatchlist),
+  UNIQUE INDEX user_movie_UNIQUE (user_id, movie_id),
+  INDEX user_time_idx (user_id ASC, time DESC, movie_id),
   CONSTRAINT fk_user_id
     FOREIGN KEY (user_id)
     REFERENCES Users (idUsers)
@@ -92,6 +95,8 @@ CREATE TABLE IF NOT EXISTS WatchedHistory (
   movie_id INT NOT NULL,
   watched_date DATETIME NOT NULL,
   PRIMARY KEY (idWatchedHistory),
+  UNIQUE INDEX user_movie_UNIQUE (user_id, movie_id),
+  INDEX user_watched_date_idx (user_id ASC, watched_date DESC, movie_id),
   CONSTRAINT fk_watched_user_id
     FOREIGN KEY (user_id)
     REFERENCES Users (idUsers)
@@ -113,4 +118,35 @@ INSERT INTO Movies (idMovies, name, imdb_id) VALUES (12, 'Finding Nemo (2003)',
 INSERT INTO Movies (idMovies, name, imdb_id) VALUES (13, 'Forrest Gump (1994)', 'tt0109830');
 INSERT INTO Movies (idMovies, name, imdb_id) VALUES (14, 'American Beauty (1999)', 'tt0169547');
 INSERT INTO Movies (idMovies, name, imdb_id) VALUES (15, 'Citizen Kane (1941)', 'tt0033467');
-INSERT INTO Movies (idMovies, name, imdb_id) VALUES (16, 'Dancer in the Dark (2000)', 'tt0168629');
\ No newline at end of file
+INSERT INTO Movies (idMovies, name, imdb_id) VALUES (16, 'Dancer in the Dark (2000)', 'tt0168629');
+
+-- One row per discussion comment, read newest first per movie
+CREATE TABLE IF NOT EXISTS DiscussionComments (
+  idComment INT NOT NULL AUTO_INCREMENT,
+  imdb_id VARCHAR(45) NOT NULL,
+  user VARCHAR(45) NOT NULL,
+  comment TEXT NOT NULL,
+  created_at DATETIME(6) NOT NULL,
+  PRIMARY KEY (idComment),
+  INDEX imdb_id_created_at_idx (imdb_id ASC, created_at ASC)
+);
+
+-- The wall, one row per review with the movie and user copied in, so a page
+-- is read newest first from the primary key without joins
+CREATE TABLE IF NOT EXISTS WallFeed (
+  idPost INT NOT NULL AUTO_INCREMENT,
+  rating_id INT NOT NULL,
+  name VARCHAR(256) NOT NULL,
+  imdb_id VARCHAR(45) NOT NULL,
+  username VARCHAR(45) NOT NULL,
+  score INT NOT NULL,
+  review TEXT NULL,
+  time DATETIME NOT NULL,
+  PRIMARY KEY (idPost),
+  UNIQUE INDEX rating_id_UNIQUE (rating_id),
+  CONSTRAINT fk_wall_rating_id
+    FOREIGN KEY (rating_id)
+    REFERENCES Ratings (idRatings)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION
+);
@@ -0,0 +1,233 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.recommenderapp.metadata import (
+    MetadataCache,
+    MetadataStore,
+    MetadataUnavailable,
+    summarize,
+)
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+MOVIES = {
+    "tt0114709": {"Title": "Toy Story", "Year": "1995", "imdbID": "tt0114709"},
+    "tt0113277": {"Title": "Heat", "Year": "1995", "imdbID": "tt0113277"},
+}
+
+# OMDB answers 200 with a transient Error for FLAKY, an HTML 503 for BROKEN
+FLAKY = "tt0000001"
+BROKEN = "tt0000002"
+
+
+class OmdbStub(BaseHTTPRequestHandler):
+    """
+    Answers like OMDB for the ids in MOVIES and records every request
+    """
+
+    requests = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serves one movie lookup.
+        """
+        params = parse_qs(urlparse(self.path).query)
+        OmdbStub.requests.append(params)
+        imdb_id = params["i"][0]
+        status, body = 200, MOVIES.get(imdb_id)
+        if params.get("apikey") != ["key"]:
+            status, body = 401, {"Response": "False", "Error": "Invalid API key!"}
+        elif imdb_id == FLAKY:
+            body = {"Response": "False", "Error": "Something went wrong."}
+        elif imdb_id == BROKEN:
+            status, body = 503, "<html>Service Unavailable</html>"
+        elif body is None:
+            body = {"Response": "False", "Error": "Incorrect IMDb ID."}
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write((body if isinstance(body, str) else json.dumps(body)).encode())
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the OMDB metadata cache, against a local stub server
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OmdbStub)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        OmdbStub.requests.clear()
+        self.store = MetadataStore(":memory:")
+
+    def make_cache(self, **kwargs):
+        return MetadataCache("key", url=self.url, store=self.store, **kwargs)
+
+    def test_fetch_once(self):
+        """
+        Test case 1
+        """
+        cache = self.make_cache()
+        self.assertEqual(cache.get("tt0114709")["Title"], "Toy Story")
+        self.assertEqual(cache.get("tt0114709")["Title"], "Toy Story")
+        self.assertEqual(len(OmdbStub.requests), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_negative_caching(self):
+        """
+        Test case 2
+        """
+        cache = self.make_cache()
+        self.assertIsNone(cache.get("tt0000000"))
+        self.assertIsNone(cache.get("tt0000000"))
+        self.assertEqual(len(OmdbStub.requests), 1)
+
+    def test_persistent_store(self):
+        """
+        Test case 3
+        """
+        self.make_cache().get("tt0113277")
+        self.make_cache().get("tt0000000")
+        second = self.make_cache()
+        self.assertEqual(second.get("tt0113277")["Title"], "Heat")
+        self.assertIsNone(second.get("tt0000000"))
+        self.assertEqual(len(OmdbStub.requests), 2)
+        self.assertEqual(second.fetches, 0)
+
+    def test_ttl(self):
+        """
+        Test case 4
+        """
+        cache = self.make_cache(ttl=100, negative_ttl=10)
+        with patch("src.recommenderapp.metadata.time.time", return_value=1000):
+            cache.get("tt0114709")
+            cache.get("tt0000000")
+        with patch("src.recommenderapp.metadata.time.time", return_value=1050):
+            cache.get("tt0114709")
+            cache.get("tt0000000")
+        self.assertEqual(len(OmdbStub.requests), 3)
+        with patch("src.recommenderapp.metadata.time.time", return_value=1200):
+            cache.get("tt0114709")
+        self.assertEqual(len(OmdbStub.requests), 4)
+
+    def test_refused_not_cached(self):
+        """
+        Test case 5
+        """
+        cache = MetadataCache("wrong", url=self.url, store=self.store)
+        with self.assertRaises(MetadataUnavailable):
+            cache.get("tt0114709")
+        self.assertIsNone(self.store.get("tt0114709"))
+        self.assertEqual(self.make_cache().get("tt0114709")["Title"], "Toy Story")
+
+    def test_get_many(self):
+        """
+        Test case 6
+        """
+        cache = self.make_cache(workers=4)
+        cache.get("tt0114709")
+        movies, unavailable = cache.get_many(
+            ["tt0114709", "tt0113277", "tt0000000", "tt0113277"]
+        )
+        self.assertEqual(movies["tt0113277"]["Title"], "Heat")
+        self.assertIsNone(movies["tt0000000"])
+        self.assertEqual(len(movies), 3)
+        self.assertEqual(unavailable, [])
+        self.assertEqual(len(OmdbStub.requests), 3)
+
+    def test_get_many_unavailable(self):
+        """
+        Test case 7
+        """
+        self.make_cache().get("tt0114709")
+        cache = MetadataCache("wrong", url=self.url, store=self.store)
+        movies, unavailable = cache.get_many(["tt0114709", "tt0113277"])
+        self.assertEqual(list(movies), ["tt0114709"])
+        self.assertEqual(unavailable, ["tt0113277"])
+
+    def test_summarize(self):
+        """
+        Test case 8
+        """
+        summary = summarize({**MOVIES["tt0113277"], "Awards": "None"})
+        self.assertEqual(summary["Title"], "Heat")
+        self.assertIsNone(summary["Poster"])
+        self.assertNotIn("Awards", summary)
+        self.assertIsNone(summarize(None))
+
+    def test_warm(self):
+        """
+        Test case 9
+        """
+        self.store.put("tt0114709", MOVIES["tt0114709"], 1000)
+        self.store.put("tt0113277", MOVIES["tt0113277"], time.time() - 10)
+        self.store.put("tt0000000", None, time.time())
+        cache = self.make_cache(ttl=100, maxsize=2)
+        self.assertEqual(cache.warm(), 2)
+        self.assertEqual(cache.get("tt0113277")["Title"], "Heat")
+        self.assertIsNone(cache.get("tt0000000"))
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(len(OmdbStub.requests), 0)
+
+    def test_transient_error_not_cached(self):
+        """
+        Test case 10
+        """
+        cache = self.make_cache()
+        for imdb_id in (FLAKY, BROKEN):
+            with self.assertRaises(MetadataUnavailable):
+                cache.get(imdb_id)
+            self.assertIsNone(self.store.get(imdb_id))
+            self.assertEqual(cache.stats()["size"], 0)
+
+    def test_store_opened_on_first_use(self):
+        """
+        Test case 11
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "data" / "omdb_cache.sqlite3"
+            store = MetadataStore(str(path))
+            self.assertFalse(path.parent.exists())
+            self.assertIsNone(store.get("tt0113277"))
+            self.assertTrue(path.is_file())
+            store.put("tt0113277", MOVIES["tt0113277"], time.time())
+            store.close()
+            self.assertIsNone(store.get("tt0113277"))
+            self.assertEqual(
+                MetadataStore(str(path)).get("tt0113277")[0]["Title"], "Heat"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
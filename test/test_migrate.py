@@ -0,0 +1,146 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import datetime
+import json
+import sys
+import unittest
+import warnings
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.recommenderapp.migrate import (
+    LIST_INDEXES,
+    add_list_indexes,
+    fill_wall_feed,
+    migrate,
+    split_discussions,
+)
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the database migrations
+    """
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.cursor = MagicMock()
+        self.db.cursor.return_value = self.cursor
+        # information_schema lookups find the table or index
+        self.cursor.fetchone.return_value = (1,)
+
+    def test_split_discussions(self):
+        """
+        Test case 1
+        """
+        comments = [
+            {"user": "user0", "comment": "Great movie!"},
+            {"user": "user1", "comment": "Agreed"},
+        ]
+        self.cursor.fetchall.return_value = [
+            (1, "tt0111161", json.dumps(comments)),
+            (2, "tt0068646", None),
+        ]
+        self.assertEqual(split_discussions(self.db), 2)
+
+        self.cursor.executemany.assert_called_once()
+        query, rows = self.cursor.executemany.call_args[0]
+        self.assertIn("INSERT INTO DiscussionComments", query)
+        self.assertEqual(
+            [row[:3] for row in rows],
+            [
+                ("tt0111161", "user0", "Great movie!"),
+                ("tt0111161", "user1", "Agreed"),
+            ],
+        )
+        # older than any new comment, in their original order
+        self.assertLess(rows[0][3], rows[1][3])
+        self.assertLess(rows[1][3], datetime.datetime(1971, 1, 1))
+        deletes = [
+            call.args[1]
+            for call in self.cursor.execute.call_args_list
+            if call.args[0].startswith("DELETE FROM Discussion")
+        ]
+        self.assertEqual(deletes, [(1,), (2,)])
+        self.assertEqual(self.db.commit.call_count, 2)
+
+    def test_nothing_to_split(self):
+        """
+        Test case 2
+        """
+        self.cursor.fetchall.return_value = []
+        self.assertEqual(split_discussions(self.db), 0)
+        self.cursor.executemany.assert_not_called()
+        self.assertIn(
+            "CREATE TABLE IF NOT EXISTS DiscussionComments",
+            self.cursor.execute.call_args_list[0].args[0],
+        )
+
+    def test_missing_legacy_table(self):
+        """
+        Test case 3
+        """
+        self.cursor.fetchone.return_value = (0,)
+        self.assertEqual(split_discussions(self.db), 0)
+        self.cursor.fetchall.assert_not_called()
+
+    def test_add_list_indexes(self):
+        """
+        Test case 4
+        """
+        self.assertEqual(add_list_indexes(self.db), 0)
+        self.cursor.fetchone.return_value = (0,)
+        self.assertEqual(add_list_indexes(self.db), len(LIST_INDEXES))
+        statements = [call.args[0] for call in self.cursor.execute.call_args_list]
+        alters = [query for query in statements if query.startswith("ALTER")]
+        self.assertIn(
+            "ALTER TABLE Watchlist ADD UNIQUE INDEX user_movie_UNIQUE (user_id, movie_id)",
+            alters,
+        )
+        # duplicates go before the unique index of their table is added
+        first_unique = statements.index(alters[0])
+        self.assertTrue(statements[first_unique - 1].startswith("DELETE a FROM"))
+
+    def test_migrate(self):
+        """
+        Test case 5
+        """
+        calls = []
+        migrations = (
+            ("0001_first", lambda db: calls.append("first")),
+            ("0002_second", lambda db: calls.append("second")),
+        )
+        self.cursor.fetchall.return_value = [("0001_first",)]
+        with patch("src.recommenderapp.migrate.MIGRATIONS", migrations):
+            self.assertEqual(migrate(self.db), ["0002_second"])
+        self.assertEqual(calls, ["second"])
+        query, params = self.cursor.execute.call_args[0]
+        self.assertIn("INSERT INTO SchemaMigrations", query)
+        self.assertEqual(params[0], "0002_second")
+
+    def test_fill_wall_feed(self):
+        """
+        Test case 6
+        """
+        self.cursor.rowcount = 3
+        self.assertEqual(fill_wall_feed(self.db), 3)
+        create, fill = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertIn("CREATE TABLE IF NOT EXISTS WallFeed", create)
+        # reviews already copied are skipped, the oldest gets the first id
+        self.assertIn("WHERE f.idPost IS NULL", fill)
+        self.assertIn("ORDER BY r.time, r.idRatings", fill)
+        self.db.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Copyright (c) 2023 Aditya Pai, Ananya Mantravadi, Rishi Singhal, Samarth Shetty
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import sys
+import unittest
+import warnings
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.prediction_scripts.catalog import MovieCatalog
+from src.recommenderapp.search import (
+    Search,
+    SearchIndex,
+    TextColumn,
+    TrigramIndex,
+    get_search_index,
+)
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+MOVIES = pd.DataFrame(
+    {
+        "movieId": [1, 2, 3, 4],
+        "title": [
+            "Toy Story (1995)",
+            "Heat (1995)",
+            "Toy Story 2 (1999)",
+            "The Story of Us (1999)",
+        ],
+        "genres": ["Animation|Comedy", "Action|Crime", "Animation|Comedy", "Drama"],
+        "imdb_id": ["tt0114709", "tt0113277", "tt0120363", "tt0160916"],
+        "director": ["John Lasseter", "Michael Mann", "John Lasseter", "Rob Reiner"],
+        "actors": ["Tom Hanks,Tim Allen", "Al Pacino", "Tom Hanks", "Bruce Willis"],
+        "imdb_ratings": ["8.3", "8.3", "7.9", "6.0"],
+    }
+)
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the precomputed search index
+    """
+
+    def setUp(self):
+        catalog = MovieCatalog.from_frame(MOVIES)
+        self.catalog = catalog
+        patcher = patch("src.recommenderapp.search.get_catalog", return_value=catalog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_text_column(self):
+        """
+        Test case 1
+        """
+        column = TextColumn(["Abc", "bcd", "", "xbcbc"])
+        self.assertEqual(list(column.rows_containing("bc")), [0, 1, 3])
+        self.assertEqual(list(column.rows_containing("")), [0, 1, 2, 3])
+        self.assertEqual(list(column.rows_containing("cb")), [3])
+        self.assertEqual(list(column.rows_containing("\x00")), [])
+
+    def test_title_search(self):
+        """
+        Test case 2
+        """
+        res = Search().results("story", "titleBased")
+        self.assertEqual(
+            res, ["Toy Story (1995)", "Toy Story 2 (1999)", "The Story of Us (1999)"]
+        )
+
+    def test_case_insensitive(self):
+        """
+        Test case 3
+        """
+        res = Search().results("the", "titleBased")
+        self.assertEqual(res, ["The Story of Us (1999)"])
+
+    def test_filters(self):
+        """
+        Test case 4
+        """
+        search = Search()
+        self.assertEqual(
+            search.search("comedy", "genreBased"),
+            ["Toy Story (1995)", "Toy Story 2 (1999)"],
+        )
+        self.assertEqual(search.search("MANN", "dirBased"), ["Heat (1995)"])
+        self.assertEqual(
+            search.search("tom hanks", "actorBased"),
+            ["Toy Story (1995)", "Toy Story 2 (1999)"],
+        )
+
+    def test_no_match(self):
+        """
+        Test case 5
+        """
+        self.assertEqual(Search().results_top_ten("zzz", "titleBased"), [])
+
+    def test_index_reused(self):
+        """
+        Test case 6
+        """
+        self.assertIs(Search().index, Search().index)
+
+    def test_trigram_index(self):
+        """
+        Test case 7
+        """
+        index = TrigramIndex(TextColumn(["Abcd", "bcd", "cdab", "xbcbc"]))
+        self.assertEqual(list(index.rows_containing("bcd")), [0, 1])
+        self.assertEqual(list(index.rows_containing("dab")), [2])
+        self.assertEqual(list(index.rows_containing("bcbc")), [3])
+        self.assertEqual(list(index.rows_containing("abcb")), [])
+        self.assertEqual(list(index.rows_containing("cd")), [0, 1, 2])
+
+    def test_suggest_matches_results(self):
+        """
+        Test case 8
+        """
+        search = Search()
+        for word in ["story", "toy", "to", "s", "", "hanks", "lasseter", "zzz"]:
+            for filter_term in ["titleBased", "dirBased", "actorBased", "genreBased"]:
+                self.assertEqual(
+                    search.suggest(word, filter_term),
+                    search.results_top_ten(word, filter_term),
+                )
+
+    def test_suggest_stops_at_k(self):
+        """
+        Test case 9
+        """
+        self.assertEqual(
+            Search().suggest("john", "dirBased", limit=1), ["Toy Story (1995)"]
+        )
+
+    def test_iter_results_is_lazy(self):
+        """
+        Test case 10
+        """
+        results = Search().iter_results("story", "titleBased")
+        self.assertEqual(next(results), "Toy Story (1995)")
+        self.assertEqual(
+            list(results), ["Toy Story 2 (1999)", "The Story of Us (1999)"]
+        )
+
+    def test_stats(self):
+        """
+        Test case 11
+        """
+        stats = Search().stats()
+        self.assertEqual(stats["rows"], 4)
+        self.assertGreater(stats["memory_bytes"], 0)
+        self.assertGreaterEqual(stats["build_seconds"], 0)
+
+    def test_rebuild_on_reload(self):
+        """
+        Test case 12
+        """
+        search = Search()
+        before = get_search_index()
+        reloaded = MovieCatalog.from_frame(MOVIES)
+        reloaded.build_indexes()
+        self.assertIs(reloaded.index("search"), reloaded.indexes["search"])
+        with patch("src.recommenderapp.search.get_catalog", return_value=reloaded):
+            self.assertIsNot(search.index, before)
+            self.assertIs(search.index.catalog, reloaded)
+        self.assertIs(search.index, before)
+
+    def test_explicit_index(self):
+        """
+        Test case 13
+        """
+        frame = MOVIES.iloc[:1]
+        search = Search(SearchIndex(MovieCatalog.from_frame(frame)))
+        self.assertEqual(search.results("story", "titleBased"), ["Toy Story (1995)"])
+
+
+if __name__ == "__main__":
+    unittest.main()
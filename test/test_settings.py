@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2023 Nathan Kohen, Nicholas Foster, Brandon Walia, Robert Kenney
+This code is licensed under MIT license (see LICENSE for details)
+
+@author: PopcornPicks
+"""
+
+import sys
+import tempfile
+import unittest
+import warnings
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# pylint: disable=wrong-import-position
+from src.recommenderapp.db import ConnectionPool
+from src.recommenderapp.settings import Settings
+
+# pylint: enable=wrong-import-position
+warnings.filterwarnings("ignore")
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the application settings
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.env_file = Path(directory.name) / ".env"
+        self.env_file.write_text(
+            "DB_USER = 'app'\nDB_NAME = 'PopcornPicksDB'\nOMDB_API_KEY = 'from-file'\n"
+        )
+
+    def test_defaults(self):
+        """
+        Test case 1
+        """
+        settings = Settings.from_env({}, env_file=self.env_file.parent / "missing")
+        self.assertEqual(settings, Settings())
+        self.assertEqual(settings.db_port, 3306)
+        self.assertIsNone(settings.omdb_api_key)
+
+    def test_env_file(self):
+        """
+        Test case 2
+        """
+        settings = Settings.from_env({}, env_file=self.env_file)
+        self.assertEqual(settings.db_user, "app")
+        self.assertEqual(settings.db_name, "PopcornPicksDB")
+        self.assertEqual(settings.omdb_api_key, "from-file")
+
+    def test_environment_wins(self):
+        """
+        Test case 3
+        """
+        settings = Settings.from_env(
+            {"OMDB_API_KEY": "from-env", "DB_PORT": "3307", "DB_POOL_TIMEOUT": "2.5"},
+            env_file=self.env_file,
+        )
+        self.assertEqual(settings.omdb_api_key, "from-env")
+        self.assertEqual(settings.db_port, 3307)
+        self.assertEqual(settings.db_pool_timeout, 2.5)
+
+    def test_reload_reads_file_again(self):
+        """
+        Test case 4
+        """
+        self.env_file.write_text("DB_POOL_SIZE = 8\n")
+        self.assertEqual(Settings.from_env({}, env_file=self.env_file).db_pool_size, 8)
+
+    def test_pool_from_settings(self):
+        """
+        Test case 5
+        """
+        settings = Settings.from_env({"DB_POOL_SIZE": "3"}, env_file=self.env_file)
+        pool = ConnectionPool.from_settings(settings)
+        self.assertEqual(pool.size, 3)
+        self.assertEqual(pool.settings["user"], "app")
+        self.assertEqual(pool.settings["port"], 3306)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@
 # pylint: disable=wrong-import-position
 # pylint: disable=wrong-import-order
 # pylint: disable=import-error
+import datetime
 import sys
 import unittest
 import warnings
@@ -18,7 +19,6 @@ from pathlib import Path
 import mysql.connector
 import pandas as pd
 from unittest.mock import MagicMock, patch
-import json
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 # pylint: disable=wrong-import-position
@@ -30,6 +30,7 @@ from src.recommenderapp.utils import (
     create_account,
     login_to_account,
     get_wall_posts,
+    get_wall_page,
     get_username,
     get_recent_movies,
     add_friend,
@@ -38,7 +39,13 @@ from src.recommenderapp.utils import (
     get_recent_friend_movies,
     create_or_update_discussion,
     get_discussion,
+    add_to_watchlist,
+    add_to_watchlist_by_movie,
+    add_to_watched_history,
+    bulk_add_to_list,
+    bulk_remove_from_list,
     get_username_data,
+    decode_discussion_cursor,
 )
 
 # pylint: enable=wrong-import-position
@@ -163,6 +170,33 @@ class Tests(unittest.TestCase):
         self.assertEqual(a.json[0]["review"], "this is a great movie")
         self.assertEqual(a.json[0]["score"], 4)
 
+    def test_get_wall_page(self):
+        posts = [{"idPost": post_id, "score": 4} for post_id in (9, 8, 7)]
+        self.cursor_mock.fetchall.return_value = posts
+        page = get_wall_page(self.db_mock, limit=2)
+        # newest first from the feed, one row more tells an older page exists
+        self.assertEqual([post["idPost"] for post in page["posts"]], [9, 8])
+        self.assertEqual(page["next_cursor"], "8")
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("FROM WallFeed ORDER BY idPost DESC", query)
+        self.assertNotIn("JOIN", query)
+        self.assertEqual(params, (3,))
+
+        self.cursor_mock.fetchall.return_value = posts[2:]
+        page = get_wall_page(self.db_mock, 2, page["next_cursor"])
+        self.assertIsNone(page["next_cursor"])
+        self.assertEqual(self.cursor_mock.execute.call_args[0][1], (8, 3))
+
+    def test_submit_review_posts_to_wall(self):
+        self.cursor_mock.fetchall.return_value = [(13,)]
+        self.cursor_mock.lastrowid = 21
+        submit_review(self.db_mock, 1, "Forrest Gump (1994)", 9, "Great")
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("INSERT INTO WallFeed", query)
+        self.assertEqual(params[0], 21)
+        self.assertEqual(params[-2:], (1, 13))
+        self.db_mock.commit.assert_called_once()
+
     def test_get_username(self):
         """
         Test case 7
@@ -228,9 +262,7 @@ class Tests(unittest.TestCase):
             "user": "user1",
             "comment": "Amazing movie, a must-watch!",
         }
-
-        # Mock the cursor to return None for no existing discussion
-        self.cursor_mock.fetchone.return_value = None
+        self.cursor_mock.lastrowid = 7
         app = flask.Flask(__name__)
         # Call the function
         response = ""
@@ -238,64 +270,43 @@ class Tests(unittest.TestCase):
         with app.test_request_context("/"):
             response, status_code = create_or_update_discussion(self.db_mock, data)
 
-        # Check if the cursor's execute method was called to insert a new discussion
-        self.cursor_mock.execute.assert_called_with(
-            "Insert INTO Discussion (imdb_id, comments) values(%s,%s)",
-            (
-                data["imdb_id"],
-                json.dumps([{"user": data["user"], "comment": data["comment"]}]),
-            ),
-        )
+        # The comment is appended as its own row, nothing is read first
+        self.cursor_mock.execute.assert_called_once()
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("INSERT INTO DiscussionComments", query)
+        self.assertEqual(params[:3], ("tt0111161", "user1", data["comment"]))
+        self.cursor_mock.fetchone.assert_not_called()
+        self.db_mock.commit.assert_called_once()
 
         # Check the returned response
         self.assertEqual(status_code, 200)
-        self.assertIn(data["comment"], response.data.decode())
-        self.assertIn(data["user"], response.data.decode())
+        self.assertEqual(response.json[0]["id"], 7)
+        self.assertEqual(response.json[0]["comment"], data["comment"])
+        self.assertEqual(response.json[0]["user"], data["user"])
 
     def test_update_discussion_existing_movie(self):
-        # Define test input
-        data = {
-            "imdb_id": "tt0111161",  # Example IMDB ID
-            "user": "user1",
-            "comment": "Amazing movie, a must-watch!",
-        }
-
-        # Mock the cursor to return an existing discussion
-        existing_comments = json.dumps([{"user": "user0", "comment": "Great movie!"}])
-        self.cursor_mock.fetchone.return_value = ("id", "tt0111161", existing_comments)
-
+        # A comment on a movie with a discussion is one more row, nothing else
+        data = {"imdb_id": "tt0111161", "user": "user2", "comment": "Again!"}
+        self.cursor_mock.lastrowid = 10001
         app = flask.Flask(__name__)
-        # Call the function
-        response = ""
-        status_code = 404
         with app.test_request_context("/"):
             response, status_code = create_or_update_discussion(self.db_mock, data)
-
-        # Check if the cursor's execute method was called to update the discussion
-        self.cursor_mock.execute.assert_called_with(
-            "Update Discussion set comments = %s where imdb_id = %s",
-            (
-                json.dumps(
-                    [
-                        {"user": "user0", "comment": "Great movie!"},
-                        {"user": "user1", "comment": "Amazing movie, a must-watch!"},
-                    ]
-                ),
-                data["imdb_id"],
-            ),
-        )
-
-        # Check the returned response
+        self.cursor_mock.execute.assert_called_once()
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertTrue(query.startswith("INSERT INTO DiscussionComments"))
+        self.assertNotIn("UPDATE", query)
+        self.assertEqual(params[:3], ("tt0111161", "user2", "Again!"))
+        self.assertEqual(len(params), 4)
+        self.db_mock.commit.assert_called_once()
         self.assertEqual(status_code, 200)
-        self.assertIn(data["comment"], response.data.decode())
-        self.assertIn(data["user"], response.data.decode())
+        self.assertEqual(response.json[0]["id"], 10001)
 
     def test_get_discussion_no_comments(self):
         # Define test input
         imdb_id = "tt0111161"  # Example IMDB ID
 
-        # Mock the cursor to return None for no existing comments
-        self.cursor_mock.fetchone.return_value = [json.dumps([])]
+        # Mock the cursor to return no comments
+        self.cursor_mock.fetchall.return_value = []
 
         app = flask.Flask(__name__)
         # Call the function
@@ -304,28 +315,159 @@ class Tests(unittest.TestCase):
         with app.test_request_context("/"):
             response, status_code = get_discussion(self.db_mock, imdb_id)
 
-        # Check if the response status is OK and data is an empty list
+        # Check if the response status is OK and the page is empty
         self.assertEqual(status_code, 200)
-        self.assertEqual(response.json, [])
+        self.assertEqual(response.json, {"comments": [], "next_cursor": None})
 
     def test_get_discussion_existing_comments(self):
         # Define test input
         imdb_id = "tt0111161"  # Example IMDB ID
+        created_at = datetime.datetime(2024, 1, 2, 3, 4, 5, 6)
 
-        # Mock the cursor to return existing comments
-        existing_comments = json.dumps([{"user": "user1", "comment": "Amazing movie!"}])
-        self.cursor_mock.fetchone.return_value = [
-            json.dumps([imdb_id, existing_comments])
+        # Newest first, one row more than the page
+        self.cursor_mock.fetchall.return_value = [
+            (3, "user3", "Third", created_at),
+            (2, "user2", "Second", created_at),
+            (1, "user1", "Amazing movie!", created_at),
         ]
         app = flask.Flask(__name__)
         response = ""
         status_code = 404
         with app.test_request_context("/"):
-            response, status_code = get_discussion(self.db_mock, imdb_id)
+            response, status_code = get_discussion(self.db_mock, imdb_id, limit=2)
 
-        # Check if the response contains the existing comments
+        # The page is oldest first and points at the older comments
         self.assertEqual(status_code, 200)
+        comments = response.json["comments"]
+        self.assertEqual([c["comment"] for c in comments], ["Second", "Third"])
+        cursor = response.json["next_cursor"]
+        self.assertEqual(decode_discussion_cursor(cursor), (created_at, 2))
+        self.assertEqual(self.cursor_mock.execute.call_args[0][1], (imdb_id, 3))
+
+        self.cursor_mock.fetchall.return_value = [
+            (1, "user1", "Amazing movie!", created_at)
+        ]
+        with app.test_request_context("/"):
+            response, _ = get_discussion(self.db_mock, imdb_id, 2, cursor)
         self.assertIn("Amazing movie!", response.data.decode())
+        self.assertIsNone(response.json["next_cursor"])
+        self.assertEqual(
+            self.cursor_mock.execute.call_args[0][1],
+            (imdb_id, created_at, created_at, 2, 3),
+        )
+        with self.assertRaises(ValueError):
+            decode_discussion_cursor("not a cursor")
+
+    def test_add_to_watchlist_single_statement(self):
+        # The affected row count tells an added movie from a listed one
+        self.cursor_mock.rowcount = 1
+        self.assertTrue(add_to_watchlist(self.db_mock, 1, "11", "2024-01-01"))
+        self.cursor_mock.execute.assert_called_once()
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("ON DUPLICATE KEY UPDATE", query)
+        self.assertEqual(params, (1, 11, "2024-01-01"))
+        self.cursor_mock.rowcount = 0
+        self.assertFalse(add_to_watchlist(self.db_mock, 1, "11"))
+
+    def test_add_to_watchlist_by_movie(self):
+        # The movie is joined on its imdb_id or name in the insert itself
+        self.cursor_mock.rowcount = 1
+        added = add_to_watchlist_by_movie(self.db_mock, 1, "tt0111161")
+        self.assertTrue(added)
+        self.cursor_mock.execute.assert_called_once()
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("INSERT INTO Watchlist", query)
+        self.assertIn("FROM Movies WHERE imdb_id = %s", query)
+        self.assertEqual((params[0], params[2]), (1, "tt0111161"))
+        self.db_mock.commit.assert_called_once()
+
+        # Nothing inserted: the insert id of the listed row tells it apart
+        # from an unknown movie, without another query
+        self.cursor_mock.reset_mock()
+        self.cursor_mock.rowcount = 0
+        self.cursor_mock.lastrowid = 12
+        added = add_to_watchlist_by_movie(self.db_mock, 1, movie_name="Up")
+        self.assertFalse(added)
+        query = self.cursor_mock.execute.call_args[0][0]
+        self.assertIn("WHERE name = %s", query)
+        self.assertIn("idWatchlist = LAST_INSERT_ID(idWatchlist)", query)
+        self.cursor_mock.lastrowid = 0
+        self.assertIsNone(add_to_watchlist_by_movie(self.db_mock, 1, "tt0"))
+        self.assertEqual(self.cursor_mock.execute.call_count, 2)
+
+    def test_add_to_watched_history(self):
+        self.cursor_mock.rowcount = 1
+        self.assertEqual(
+            add_to_watched_history(self.db_mock, 1, "tt0111161", "2024-01-01"),
+            (True, "Movie added to watched history"),
+        )
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("INSERT INTO WatchedHistory", query)
+        self.assertEqual(params, (1, "2024-01-01", "tt0111161"))
+        self.assertEqual(self.cursor_mock.execute.call_count, 1)
+        self.cursor_mock.rowcount = 0
+        self.cursor_mock.lastrowid = 5
+        self.assertEqual(
+            add_to_watched_history(self.db_mock, 1, "tt0111161"),
+            (False, "Movie already in watched history"),
+        )
+        self.cursor_mock.lastrowid = None
+        self.assertEqual(
+            add_to_watched_history(self.db_mock, 1, None, movie_name="Nope"),
+            (False, "Movie not found"),
+        )
+
+    def test_bulk_add_to_list(self):
+        # One lookup resolves ids and titles, one executemany inserts
+        self.cursor_mock.fetchall.return_value = [
+            (1, "tt0000001", "Up", 0),
+            (2, "tt0000002", "Heat", 1),
+        ]
+        movies = ["tt0000001", "heat", "Unknown", "UP"]
+        results = bulk_add_to_list(
+            self.db_mock, "Watchlist", "time", 7, movies, "2024-01-01"
+        )
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["added", "already_listed", "not_found", "already_listed"],
+        )
+        self.cursor_mock.execute.assert_called_once()
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("IN (%s, %s, %s, %s)", query)
+        self.assertEqual(params, [7, *movies, *movies])
+        self.cursor_mock.executemany.assert_called_once()
+        self.assertEqual(
+            self.cursor_mock.executemany.call_args[0][1], [(7, 1, "2024-01-01")]
+        )
+        self.db_mock.commit.assert_called_once()
+
+    def test_bulk_remove_from_list(self):
+        self.cursor_mock.fetchall.return_value = [
+            (1, "tt0000001", "Up", 0),
+            (2, "tt0000002", "Heat", 1),
+            (3, "tt0000003", "Alien", 1),
+        ]
+        results = bulk_remove_from_list(
+            self.db_mock, "WatchedHistory", 7, ["tt0000001", "Heat", "Alien", "x"]
+        )
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["not_listed", "removed", "removed", "not_found"],
+        )
+        query, params = self.cursor_mock.execute.call_args[0]
+        self.assertIn("DELETE FROM WatchedHistory", query)
+        self.assertEqual(params[0], 7)
+        self.assertEqual(sorted(params[1:]), [2, 3])
+        self.assertEqual(self.cursor_mock.execute.call_count, 2)
+
+    def test_bulk_add_rolls_back(self):
+        # A failed insert leaves none of the movies added
+        self.cursor_mock.fetchall.return_value = [(1, "tt0000001", "Up", 0)]
+        self.cursor_mock.executemany.side_effect = mysql.connector.Error("boom")
+        with self.assertRaises(mysql.connector.Error):
+            bulk_add_to_list(self.db_mock, "Watchlist", "time", 7, ["Up"])
+        self.db_mock.rollback.assert_called_once()
+        self.db_mock.commit.assert_not_called()
 
     def test_get_username_data_valid_user(self):
         # Define test input
@@ -27,6 +27,7 @@ class Tests(unittest.TestCase):
         executor.execute("SET FOREIGN_KEY_CHECKS=0;")
         executor.execute("DELETE FROM Users")
         executor.execute("DELETE FROM Ratings")
+        executor.execute("DELETE FROM WallFeed")
         executor.execute("DELETE FROM Friends")
         executor.execute("DELETE FROM Watchlist")
         db.commit()
@@ -3,11 +3,27 @@ import json
 import sys
 from pathlib import Path
 import os
+import tempfile
+from dataclasses import replace
+from unittest.mock import MagicMock, patch
+
+import requests
 
 sys.path.append(str(Path(__file__).resolve().parents[2]))
+# keep the OMDB cache the app opens out of the working tree
+os.environ.setdefault(
+    "OMDB_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "omdb_cache.sqlite3")
+)
 # pylint: disable=wrong-import-position
 
-from src.recommenderapp.app import app
+from src.recommenderapp.app import (
+    MAX_METADATA_IDS,
+    app,
+    configure,
+    current_settings,
+    warm_up,
+)
+from src.recommenderapp.metadata import MetadataUnavailable
 
 
 class TestApp(unittest.TestCase):
@@ -47,6 +63,21 @@ class TestApp(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_predict_g_k(self):
+        data = {"movie_list": ["Inception", "The Matrix"], "k": 5}
+        response = self.app.post(
+            "/genreBased", data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.json["recommendations"]), 5)
+
+    def test_predict_g_invalid_k(self):
+        data = {"movie_list": ["Inception", "The Matrix"], "k": 0}
+        response = self.app.post(
+            "/genreBased", data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_predict_d(self):
         data = {"movie_list": ["Inception", "The Matrix"]}
         response = self.app.post(
@@ -99,6 +130,48 @@ class TestApp(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_predict_batch(self):
+        data = {"movie_lists": [["Inception"], ["The Matrix"]], "mode": "genreBased"}
+        response = self.app.post(
+            "/batch", data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["results"]), 2)
+        self.assertIn("recommendations", response.json["results"][0])
+
+    def test_predict_batch_invalid(self):
+        data = {"movie_lists": [["Inception"], []]}
+        response = self.app.post(
+            "/batch", data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_limit(self):
+        data = {"q": "toy", "filter": "titleBased", "limit": "3"}
+        response = self.app.post("/search", data=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.json), 3)
+
+    def test_search_invalid_limit(self):
+        data = {"q": "toy", "filter": "titleBased", "limit": "0"}
+        response = self.app.post("/search", data=data)
+        self.assertEqual(response.status_code, 400)
+
+    def test_movies_metadata_invalid(self):
+        response = self.app.post(
+            "/movies/metadata",
+            data=json.dumps({"imdb_ids": "tt0376994"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_movies_metadata_too_many(self):
+        data = {"imdb_ids": ["tt0376994"] * 101}
+        response = self.app.post(
+            "/movies/metadata", data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_create_account_invalid(self):
         data = {"an_invalid_field": "test"}
         response = self.app.post(
@@ -157,6 +230,71 @@ class TestApp(unittest.TestCase):
         response = self.app.get("/movie/1")
         self.assertEqual(response.status_code, 404)
 
+    def test_render_movie_omdb_refused(self):
+        # a rejected API key or exhausted quota reads as an unknown movie
+        with patch.object(
+            app.config["METADATA"], "get", side_effect=MetadataUnavailable("key")
+        ):
+            response = self.app.get("/movie/tt0376994")
+        self.assertEqual(response.status_code, 404)
+
+    def test_render_movie_omdb_down(self):
+        with patch.object(
+            app.config["METADATA"], "get", side_effect=requests.ConnectionError()
+        ):
+            response = self.app.get("/movie/tt0376994")
+        self.assertEqual(response.status_code, 502)
+
+    def test_list_metadata_capped(self):
+        # OMDB is asked about MAX_METADATA_IDS movies, the rest only hit the cache
+        rows = [{"name": str(i), "imdb_id": f"tt{i:07d}"} for i in range(150)]
+        db = MagicMock()
+        db.cursor.return_value.fetchall.return_value = rows
+        metadata = app.config["METADATA"]
+        with patch("src.recommenderapp.app.get_db", return_value=db), patch.object(
+            metadata, "get_many", return_value=({}, [])
+        ) as get_many, patch.object(metadata, "cached", return_value=None) as cached:
+            response = self.app.get("/getWatchlistData?include=metadata")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(get_many.call_args[0][0]), MAX_METADATA_IDS)
+        self.assertEqual(cached.call_count, 150 - MAX_METADATA_IDS)
+
+    def test_live(self):
+        response = self.app.get("/live")
+        self.assertEqual(response.status_code, 200)
+
+    def test_ready_after_warm_up(self):
+        self.assertTrue(warm_up())
+        response = self.app.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.json["components"]),
+            {"catalog", "search", "recommender", "metadata"},
+        )
+
+    def test_reload_closes_metadata(self):
+        # each reload that changes the OMDB settings releases the old ones
+        settings = current_settings()
+        self.addCleanup(configure, settings)
+        for api_key in ("first", "second"):
+            client = app.config["HTTP_CLIENT"]
+            store = app.config["METADATA"].store
+            with patch.object(client, "close") as close:
+                configure(replace(settings, omdb_api_key=api_key))
+            close.assert_called_once()
+            self.assertTrue(store.closed)
+            self.assertFalse(app.config["METADATA"].store.closed)
+            self.assertIsNot(app.config["HTTP_CLIENT"], client)
+
+    def test_bulk_list_invalid(self):
+        for body in ({}, {"movies": []}, {"movies": ["tt0111161", ""]}):
+            response = self.app.post("/add_to_watchlist/bulk", json=body)
+            self.assertEqual(response.status_code, 400)
+        response = self.app.post(
+            "/remove_from_watched_history/bulk", json={"movies": ["x"] * 1001}
+        )
+        self.assertEqual(response.status_code, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,137 @@
+import sys
+import unittest
+import warnings
+from pathlib import Path
+import mysql.connector
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.recommenderapp.migrate import migrate
+from src.recommenderapp.utils import (
+    WATCHLIST_QUERY,
+    WATCHED_HISTORY_QUERY,
+    get_wall_page,
+    submit_review,
+)
+
+warnings.filterwarnings("ignore")
+
+
+class Tests(unittest.TestCase):
+    """
+    Test cases for the indexes behind the list endpoints and the wall
+    """
+
+    def setUp(self):
+        self.db = mysql.connector.connect(
+            user="root", password="root", host="127.0.0.1", database="testDB"
+        )
+        executor = self.db.cursor()
+        executor.execute("SET FOREIGN_KEY_CHECKS=0;")
+        executor.execute("DELETE FROM Watchlist")
+        executor.execute("DELETE FROM WatchedHistory")
+        executor.execute("DELETE FROM Users")
+        executor.execute(
+            "INSERT INTO Users(idUsers, username, email, password) VALUES "
+            "(1, 'listUser', 'list@test.com', 'x'), (2, 'otherUser', 'other@test.com', 'x')"
+        )
+        executor.execute("SELECT idMovies FROM Movies")
+        movies = [row[0] for row in executor.fetchall()]
+        for user_id in (1, 2):
+            for day, movie_id in enumerate(movies, start=1):
+                executor.execute(
+                    "INSERT INTO Watchlist(user_id, movie_id, time) VALUES (%s, %s, %s)",
+                    (user_id, movie_id, f"2024-10-{day:02d}"),
+                )
+                executor.execute(
+                    "INSERT INTO WatchedHistory(user_id, movie_id, watched_date) "
+                    "VALUES (%s, %s, %s)",
+                    (user_id, movie_id, f"2024-10-{day:02d}"),
+                )
+        self.db.commit()
+        migrate(self.db)
+
+    def tearDown(self):
+        # leave nothing behind for later runs and the other suites
+        executor = self.db.cursor()
+        executor.execute(
+            "DELETE f FROM WallFeed f JOIN Ratings r ON r.idRatings = f.rating_id "
+            "WHERE r.user_id IN (1, 2)"
+        )
+        executor.execute("DELETE FROM Ratings WHERE user_id IN (1, 2)")
+        executor.execute("DELETE FROM Watchlist WHERE user_id IN (1, 2)")
+        executor.execute("DELETE FROM WatchedHistory WHERE user_id IN (1, 2)")
+        executor.execute("DELETE FROM Users WHERE idUsers IN (1, 2)")
+        self.db.commit()
+        self.db.close()
+
+    def explain(self, query, table):
+        executor = self.db.cursor(dictionary=True)
+        executor.execute("EXPLAIN " + query, [1])
+        return next(row for row in executor.fetchall() if row["table"] == table)
+
+    def test_watchlist_uses_index(self):
+        """
+        The watchlist is read in order from the (user_id, time) index
+        """
+        plan = self.explain(WATCHLIST_QUERY, "w")
+        self.assertEqual(plan["key"], "user_time_idx")
+        self.assertNotIn("filesort", plan["Extra"] or "")
+
+    def test_watched_history_uses_index(self):
+        """
+        The watched history is read in order from the (user_id, watched_date) index
+        """
+        plan = self.explain(WATCHED_HISTORY_QUERY, "wh")
+        self.assertEqual(plan["key"], "user_watched_date_idx")
+        self.assertNotIn("filesort", plan["Extra"] or "")
+
+    def test_unique_watchlist(self):
+        """
+        A movie is on a watchlist at most once
+        """
+        executor = self.db.cursor()
+        executor.execute("SELECT movie_id FROM Watchlist WHERE user_id = 1 LIMIT 1")
+        movie_id = executor.fetchone()[0]
+        with self.assertRaises(mysql.connector.IntegrityError):
+            executor.execute(
+                "INSERT INTO Watchlist(user_id, movie_id, time) VALUES (1, %s, NOW())",
+                (movie_id,),
+            )
+
+    def test_migrate_twice(self):
+        """
+        Applied migrations are not run again
+        """
+        self.assertEqual(migrate(self.db), [])
+
+    def test_review_posted_to_wall(self):
+        """
+        A submitted review is the newest post of the wall feed
+        """
+        executor = self.db.cursor()
+        executor.execute("SELECT name, imdb_id FROM Movies LIMIT 1")
+        name, imdb_id = executor.fetchone()
+        submit_review(self.db, 1, name, 4, "Wall review")
+        post = get_wall_page(self.db, limit=1)["posts"][0]
+        self.assertEqual(
+            (post["name"], post["imdb_id"], post["username"], post["review"]),
+            (name, imdb_id, "listUser", "Wall review"),
+        )
+
+    def test_wall_uses_primary_key(self):
+        """
+        A wall page is read backwards from the primary key, without sorting
+        """
+        executor = self.db.cursor(dictionary=True)
+        executor.execute(
+            "EXPLAIN SELECT idPost FROM WallFeed WHERE idPost < %s "
+            "ORDER BY idPost DESC LIMIT %s",
+            (1000, 51),
+        )
+        plan = executor.fetchall()[0]
+        self.assertNotIn("filesort", plan["Extra"] or "")
+
+
+if __name__ == "__main__":
+    unittest.main()